@@ -1,23 +1,318 @@
+from bisect import bisect_left, insort
 from collections import defaultdict, deque
-from typing import Dict, Set, Tuple, List, Optional
+from typing import Dict, Set, FrozenSet, Tuple, List, Optional, NamedTuple
 import json
 
+try:
+    # Serializador em C, opcional: se não estiver instalado, usa o json padrão
+    import orjson
+except ImportError:
+    orjson = None
+
 EPSILON = "&"
 
 
+class CompiledDFA(NamedTuple):
+    """Tabela plana de um AFD: trans[estado * len(sym_idx) + símbolo] -> estado, ou -1.
+
+    rows[estado] é a mesma linha como dicionário caractere -> estado: caracteres
+    fora do alfabeto simplesmente não aparecem, e a simulação faz uma consulta só.
+    byte_rows[estado][byte] repete a linha indexada pelo código ASCII (-1 = sem
+    transição); só existe quando todos os símbolos são ASCII.
+    """
+    states: List[str]
+    index: Dict[str, int]
+    sym_idx: Dict[str, int]
+    trans: List[int]
+    rows: List[Dict[str, int]]
+    byte_rows: Optional[List[List[int]]] = None
+
+
+def _union_of_bits(mask: int, rows: List[int]) -> int:
+    """Retorna o OR de rows[i] para cada bit i ligado em `mask`."""
+    result = 0
+    while mask:
+        low = mask & -mask
+        result |= rows[low.bit_length() - 1]
+        mask ^= low
+    return result
+
+
+def _byte_tables(rows: List[int]) -> List[List[int]]:
+    """Pré-calcula, para cada bloco de 8 estados, o OR das linhas de cada byte possível.
+
+    tables[c][b] é a união de rows[8*c + i] para cada bit i ligado em b, montada
+    de forma incremental (b sem o bit mais baixo, mais a linha desse bit).
+    """
+    tables = []
+    for base in range(0, len(rows), 8):
+        chunk = rows[base:base + 8]
+        table = [0] * (1 << len(chunk))
+        for b in range(1, len(table)):
+            low = b & -b
+            table[b] = table[b ^ low] | chunk[low.bit_length() - 1]
+        tables.append(table)
+    return tables
+
+
+def _union_by_bytes(mask: int, tables: List[List[int]]) -> int:
+    """Mesmo resultado de _union_of_bits, mas consumindo a máscara um byte por vez."""
+    result = 0
+    c = 0
+    while mask:
+        byte = mask & 0xFF
+        if byte:
+            result |= tables[c][byte]
+        mask >>= 8
+        c += 1
+    return result
+
+
+def _symbol_trie(symbols) -> dict:
+    """Monta uma trie de símbolos: cada nó mapeia caractere -> nó filho, e a chave
+    None guarda o símbolo que termina naquele nó."""
+    root: dict = {}
+    for sym in symbols:
+        node = root
+        for ch in sym:
+            node = node.setdefault(ch, {})
+        node[None] = sym
+    return root
+
+
+def _subset_construct(start: int, step_rows: List[List[int]]) -> Tuple[List[int], List[List[int]]]:
+    """Construção de subconjuntos sobre máscaras de bits.
+
+    step_rows[k][i] é a máscara de fecho-ε(δ(i, k-ésimo símbolo)). Como o fecho
+    distribui sobre a união, o passo de um subconjunto T é só o OR das linhas dos
+    bits de T. Retorna os subconjuntos na ordem em que foram descobertos (BFS) e a
+    tabela delta[t][k] -> índice do subconjunto destino, ou -1 quando não há
+    transição.
+    """
+    # Linhas agrupadas por byte: cada passo custa uma consulta por bloco de 8
+    # estados em vez de uma iteração por bit ligado
+    step_tables = [_byte_tables(rows) for rows in step_rows]
+    order = [start]
+    sid = {start: 0}
+    delta: List[List[int]] = []
+    t = 0
+    while t < len(order):
+        T = order[t]
+        row = []
+        for tables in step_tables:
+            U = _union_by_bytes(T, tables)
+            if not U:
+                row.append(-1)
+                continue
+            u = sid.get(U)
+            if u is None:
+                u = sid[U] = len(order)
+                order.append(U)
+            row.append(u)
+        delta.append(row)
+        t += 1
+    return order, delta
+
+
+def _hopcroft(delta: List[List[int]], is_final: List[bool]) -> Tuple[List[int], List[List[int]]]:
+    """Refinamento de Hopcroft sobre um AFD completo numerado densamente.
+
+    delta[i][k] é o destino do estado i pelo k-ésimo símbolo. Retorna class_of
+    (estado -> bloco) e members (bloco -> estados).
+    """
+    n = len(delta)
+    n_syms = len(delta[0]) if n else 0
+
+    # Índice inverso por símbolo: inverse[k][j] = estados i com delta[i][k] = j. Os
+    # predecessores de cada divisor saem das arestas que chegam nele
+    inverse: List[List[List[int]]] = [[[] for _ in range(n)] for _ in range(n_syms)]
+    for i, row in enumerate(delta):
+        for k, j in enumerate(row):
+            inverse[k][j].append(i)
+
+    finals = [i for i in range(n) if is_final[i]]
+    non_finals = [i for i in range(n) if not is_final[i]]
+    members: List[List[int]] = [group for group in (finals, non_finals) if group]
+    class_of = [0] * n
+    for block, group in enumerate(members):
+        for i in group:
+            class_of[i] = block
+
+    # Lista de trabalho com ids de bloco. Ao dividir um bloco, a metade menor recebe
+    # um id novo e é sempre empilhada: se o bloco já estava pendente, o id antigo
+    # continua valendo para a metade maior, então nunca é preciso procurar nem
+    # remover blocos da lista
+    worklist = deque()
+    if len(members) == 2:
+        worklist.append(0 if len(members[0]) <= len(members[1]) else 1)
+
+    while worklist:
+        A = list(members[worklist.popleft()])
+        for inv_c in inverse:
+            # Predecessores de A por c, agrupados pelo bloco a que pertencem
+            touched: Dict[int, List[int]] = {}
+            for j in A:
+                for i in inv_c[j]:
+                    touched.setdefault(class_of[i], []).append(i)
+
+            for y, inter in touched.items():
+                if len(inter) == len(members[y]):
+                    continue
+                inter_set = set(inter)
+                diff = [i for i in members[y] if i not in inter_set]
+                # Só a metade menor tem class_of atualizado
+                small, large = (inter, diff) if len(inter) <= len(diff) else (diff, inter)
+                new_block = len(members)
+                members[y] = large
+                members.append(small)
+                for i in small:
+                    class_of[i] = new_block
+                worklist.append(new_block)
+
+    return class_of, members
+
+
+def _reachability_closures(adj: Dict[str, Set[str]]) -> Dict[str, FrozenSet[str]]:
+    """Conjunto alcançável a partir de cada vértice de `adj` (incluindo ele mesmo).
+
+    Usa Tarjan (iterativo) para achar as componentes fortemente conexas: elas saem
+    em ordem topológica reversa, então o fecho de uma componente é a união dos seus
+    membros com os fechos, já prontos, das componentes sucessoras. Todos os membros
+    de uma componente compartilham o mesmo frozenset.
+    """
+    closures: Dict[str, FrozenSet[str]] = {}
+    order: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: Set[str] = set()
+
+    for root in adj:
+        if root in order:
+            continue
+        order[root] = low[root] = len(order)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(adj.get(root, ())))]
+        while work:
+            v, successors = work[-1]
+            for w in successors:
+                if w not in order:
+                    order[w] = low[w] = len(order)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(adj.get(w, ()))))
+                    break
+                if w in on_stack and order[w] < low[v]:
+                    low[v] = order[w]
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == order[v]:
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        members.append(w)
+                        if w == v:
+                            break
+                    reach = set(members)
+                    for m in members:
+                        for w in adj.get(m, ()):
+                            if w in closures:
+                                reach |= closures[w]
+                    frozen = frozenset(reach)
+                    for m in members:
+                        closures[m] = frozen
+    return closures
+
+
 class Automato:
+    # Atributos fixos: sem __dict__ por instância (conversões criam muitos autômatos)
+    __slots__ = (
+        "states", "start_state", "final_states", "transitions", "alphabet",
+        "_by_src", "_by_dst", "_eps_closure", "_subset_step", "_subset_trie",
+        "_dict_cache", "_json_cache", "_edge_symbols", "_is_dfa", "_compiled_dfa", "_sorted_states", "_state_order", "_single_chars",
+    )
+
     def __init__(self):
         self.states: Set[str] = set()
         self.start_state: Optional[str] = None
         self.final_states: Set[str] = set()
         self.transitions: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
         self.alphabet: Set[str] = set()
+        # Índices mantidos junto com `transitions` (compartilham os mesmos conjuntos de destino):
+        # origem -> {símbolo: destinos} e destino -> {(origem, símbolo)}
+        self._by_src: Dict[str, Dict[str, Set[str]]] = {}
+        self._by_dst: Dict[str, Set[Tuple[str, str]]] = {}
+        # Fecho-ε de cada estado, calculado sob demanda e descartado a cada mutação
+        self._eps_closure: Optional[Dict[str, FrozenSet[str]]] = None
+        # Passos já calculados da simulação: (conjunto_ativo, símbolo) -> fecho-ε do destino
+        self._subset_step: Dict[Tuple[FrozenSet[str], str], FrozenSet[str]] = {}
+        # Trie dos símbolos não-ε que saem de cada conjunto ativo (ver _symbol_trie)
+        self._subset_trie: Dict[FrozenSet[str], dict] = {}
+        # Último dicionário/JSON gerado, junto com a chave (início, estados, finais, alfabeto) usada.
+        # A GUI altera estados finais e inicial diretamente, por isso eles entram na chave
+        self._dict_cache: Optional[Tuple[tuple, dict]] = None
+        self._json_cache: Optional[Tuple[tuple, str]] = None
+        # Símbolos agrupados por aresta (origem, destino), ver edge_symbols
+        self._edge_symbols: Optional[Dict[Tuple[str, str], FrozenSet[str]]] = None
+        # Resultado de is_dfa (None = recalcular na próxima chamada)
+        self._is_dfa: Optional[bool] = None
+        # Tabela de simulação do AFD, montada por compile_dfa
+        self._compiled_dfa: Optional[CompiledDFA] = None
+        # Estados em ordem alfabética, mantidos com bisect por add_state/remove_state/
+        # rename_state (None = reordenar tudo, p.ex. depois de from_json), e a tupla
+        # entregue por sorted_states, refeita por cópia só depois de uma mutação
+        self._state_order: Optional[List[str]] = []
+        self._sorted_states: Optional[Tuple[str, ...]] = None
+        # Caracteres dos símbolos do alfabeto (ver single_char_alphabet)
+        self._single_chars: Optional[FrozenSet[str]] = None
+
+    def _rebuild_index(self):
+        """Reconstrói os índices por origem/destino a partir de `transitions`."""
+        self._by_src = {}
+        self._by_dst = {}
+        for (src, sym), dsts in self.transitions.items():
+            self._by_src.setdefault(src, {})[sym] = dsts
+            for dst in dsts:
+                self._by_dst.setdefault(dst, set()).add((src, sym))
+
+    def _drop_key(self, key: Tuple[str, str]):
+        """Remove uma chave (origem, símbolo) de `transitions` e do índice por origem."""
+        self.transitions.pop(key, None)
+        src, sym = key
+        row = self._by_src.get(src)
+        if row is not None:
+            row.pop(sym, None)
+            if not row:
+                del self._by_src[src]
+
+    def _invalidate_caches(self, epsilon: bool = True):
+        """Descarta as estruturas derivadas das transições (recalculadas sob demanda).
+
+        A tabela de fecho-ε só depende das arestas ε: mutações que não as tocam
+        passam `epsilon=False` e a mantêm.
+        """
+        if epsilon:
+            self._eps_closure = None
+        self._subset_step = {}
+        self._subset_trie = {}
+        self._dict_cache = None
+        self._json_cache = None
+        self._edge_symbols = None
+        self._is_dfa = None
+        self._compiled_dfa = None
 
     # -------------------------
     # Manipulação de estados e transições
     # -------------------------
     def add_state(self, state: str, is_start=False, is_final=False):
-        self.states.add(state)
+        if state not in self.states:
+            self.states.add(state)
+            self._order_insert(state)
         if is_start or self.start_state is None:
             self.start_state = state
         if is_final:
@@ -27,8 +322,22 @@ class Automato:
         if src not in self.states or dst not in self.states:
             raise ValueError("Estado inexistente.")
         if symbol != EPSILON:
-            self.alphabet.add(symbol)
-        self.transitions[(src, symbol)].add(dst)
+            if symbol not in self.alphabet:
+                self.alphabet.add(symbol)
+                # Só um símbolo novo pode trazer caracteres novos
+                if self._single_chars is not None and not self._single_chars.issuperset(symbol):
+                    self._single_chars = self._single_chars.union(symbol)
+        dsts = self.transitions[(src, symbol)]
+        dsts.add(dst)
+        self._by_src.setdefault(src, {})[symbol] = dsts
+        self._by_dst.setdefault(dst, set()).add((src, symbol))
+        was_dfa = self._is_dfa
+        self._invalidate_caches(epsilon=symbol == EPSILON)
+        # Uma aresta nova só pode quebrar o determinismo: decide sem reescanear
+        if symbol == EPSILON or len(symbol) > 1 or len(dsts) > 1:
+            self._is_dfa = False
+        elif was_dfa:
+            self._is_dfa = True
 
     def remove_state(self, state_to_remove: str):
         """Remove um estado e todas as suas transições associadas."""
@@ -36,20 +345,32 @@ class Automato:
             return
 
         self.states.discard(state_to_remove)
+        self._order_remove(state_to_remove)
 
         if self.start_state == state_to_remove:
             self.start_state = None
 
         self.final_states.discard(state_to_remove)
 
-        new_transitions = defaultdict(set)
-        for (src, sym), dsts in self.transitions.items():
-            if src != state_to_remove:
-                new_dsts = dsts - {state_to_remove}
-                if new_dsts:
-                    new_transitions[(src, sym)] = new_dsts
-        
-        self.transitions = new_transitions
+        # Transições de saída: vêm direto do índice por origem
+        for sym, dsts in self._by_src.pop(state_to_remove, {}).items():
+            self.transitions.pop((state_to_remove, sym), None)
+            for dst in dsts:
+                incoming = self._by_dst.get(dst)
+                if incoming is not None:
+                    incoming.discard((state_to_remove, sym))
+
+        # Transições de entrada: só as chaves registradas no índice por destino
+        for key in self._by_dst.pop(state_to_remove, ()):
+            dsts = self.transitions.get(key)
+            if dsts is None:
+                continue
+            dsts.discard(state_to_remove)
+            if not dsts:
+                self._drop_key(key)
+
+        # Estados fora da tabela de fecho-ε não têm arestas ε: o fecho não muda
+        self._invalidate_caches(epsilon=state_to_remove in (self._eps_closure or ()))
 
     def rename_state(self, old_name: str, new_name: str):
         """Renomeia um estado em toda a estrutura do autômato."""
@@ -60,6 +381,8 @@ class Automato:
 
         self.states.remove(old_name)
         self.states.add(new_name)
+        self._order_remove(old_name)
+        self._order_insert(new_name)
 
         if self.start_state == old_name:
             self.start_state = new_name
@@ -68,12 +391,61 @@ class Automato:
             self.final_states.remove(old_name)
             self.final_states.add(new_name)
 
-        new_transitions = defaultdict(set)
-        for (src, sym), dsts in self.transitions.items():
-            new_src = new_name if src == old_name else src
-            new_dsts = {new_name if d == old_name else d for d in dsts}
-            new_transitions[(new_src, sym)] = new_dsts
-        self.transitions = new_transitions
+        # Só as arestas que tocam o estado mudam: saídas pelo índice por origem,
+        # entradas pelo índice por destino (custo proporcional ao grau)
+        row = self._by_src.pop(old_name, None)
+        if row is not None:
+            for sym, dsts in row.items():
+                del self.transitions[(old_name, sym)]
+                self.transitions[(new_name, sym)] = dsts
+                for dst in dsts:
+                    incoming = self._by_dst[dst]
+                    incoming.discard((old_name, sym))
+                    incoming.add((new_name, sym))
+            self._by_src[new_name] = row
+
+        incoming = self._by_dst.pop(old_name, None)
+        if incoming is not None:
+            for key in incoming:
+                dsts = self.transitions[key]
+                dsts.discard(old_name)
+                dsts.add(new_name)
+            self._by_dst[new_name] = incoming
+
+        self._invalidate_caches(epsilon=old_name in (self._eps_closure or ()))
+
+    @property
+    def single_char_alphabet(self) -> FrozenSet[str]:
+        """Caracteres que compõem os símbolos do alfabeto ("aa" contribui com "a").
+
+        Calculado uma vez e atualizado por add_transition quando surge um símbolo novo.
+        """
+        if self._single_chars is None:
+            self._single_chars = frozenset(char for sym in self.alphabet for char in sym)
+        return self._single_chars
+
+    def sorted_states(self) -> Tuple[str, ...]:
+        """Retorna os estados em ordem alfabética (reaproveitado até mudar `states`)."""
+        if self._sorted_states is None:
+            if self._state_order is None:
+                self._state_order = sorted(self.states)
+            self._sorted_states = tuple(self._state_order)
+        return self._sorted_states
+
+    def _order_insert(self, state: str):
+        """Insere um estado novo na lista ordenada, sem reordenar as demais."""
+        if self._state_order is not None:
+            insort(self._state_order, state)
+        self._sorted_states = None
+
+    def _order_remove(self, state: str):
+        """Retira um estado da lista ordenada pela busca binária."""
+        order = self._state_order
+        if order is not None:
+            i = bisect_left(order, state)
+            if i < len(order) and order[i] == state:
+                del order[i]
+        self._sorted_states = None
 
     # --- NOVO MÉTODO ADICIONADO ---
     def remove_transition(self, src: str, symbol: str, dst: str):
@@ -81,31 +453,74 @@ class Automato:
         key = (src, symbol)
         if key in self.transitions:
             self.transitions[key].discard(dst)
+            incoming = self._by_dst.get(dst)
+            if incoming is not None:
+                incoming.discard(key)
             # Se o conjunto de destinos ficar vazio, remove a entrada do dicionário
             if not self.transitions[key]:
-                del self.transitions[key]
+                self._drop_key(key)
+            self._invalidate_caches(epsilon=symbol == EPSILON)
     # -----------------------------
 
+    def edge_symbols(self) -> Dict[Tuple[str, str], FrozenSet[str]]:
+        """Agrupa as transições por aresta: (origem, destino) -> símbolos.
+
+        Calculado sob demanda e reaproveitado até a próxima mutação das transições
+        (quem desenha o autômato chama isso a cada redesenho). Não altere o resultado.
+        """
+        if self._edge_symbols is None:
+            grouped: Dict[Tuple[str, str], Set[str]] = {}
+            for (src, sym), dsts in self.transitions.items():
+                for dst in dsts:
+                    grouped.setdefault((src, dst), set()).add(sym)
+            self._edge_symbols = {pair: frozenset(syms) for pair, syms in grouped.items()}
+        return self._edge_symbols
+
     # -------------------------
     # Simulação
     # -------------------------
-    def epsilon_closure(self, states: Set[str]) -> Set[str]:
-        """Calcula o fecho-ε de um conjunto de estados."""
-        closure = set(states)
-        stack = list(states)
-        while stack:
-            state = stack.pop()
-            for nxt in self.transitions.get((state, EPSILON), []):
-                if nxt not in closure:
-                    closure.add(nxt)
-                    stack.append(nxt)
-        return closure
+    def _epsilon_closure_table(self) -> Dict[str, FrozenSet[str]]:
+        """Retorna o fecho-ε de cada estado que possui transições ε.
+
+        A tabela é montada uma única vez (componentes fortemente conexas do grafo
+        de transições ε) e reutilizada até a próxima mutação; estados ausentes
+        dela têm fecho {estado}.
+        """
+        table = self._eps_closure
+        if table is None:
+            eps_adj = {src: dsts for (src, sym), dsts in self.transitions.items()
+                       if sym == EPSILON and dsts}
+            table = self._eps_closure = _reachability_closures(eps_adj)
+        return table
+
+    def epsilon_closure(self, states: Set[str]) -> FrozenSet[str]:
+        """Calcula o fecho-ε de um conjunto de estados.
 
-    def move(self, states: Set[str], symbol: str) -> Set[str]:
-        nxt_states = set()
+        Retorna frozenset: pode ser usado direto como chave, sem cópia.
+        """
+        table = self._epsilon_closure_table()
+        if len(states) == 1:
+            # Um único estado: o fecho já está pronto na tabela
+            (s,) = states
+            return table.get(s) or frozenset((s,))
+        return frozenset().union(*(table.get(s, (s,)) for s in states))
+
+    def move(self, states: Set[str], symbol: str) -> FrozenSet[str]:
+        # Referência local evita buscar o método a cada iteração
+        get = self.transitions.get
+        return frozenset().union(*(get((s, symbol), ()) for s in states))
+
+    def _move_closure(self, states, symbol: str) -> FrozenSet[str]:
+        """move seguido do fecho-ε numa única passada, sem conjuntos intermediários."""
+        table = self._epsilon_closure_table()
+        closure = set()
+        get = self.transitions.get
+        update = closure.update
         for s in states:
-            nxt_states |= self.transitions.get((s, symbol), set())
-        return nxt_states
+            for nxt in get((s, symbol), ()):
+                if nxt not in closure:
+                    update(table.get(nxt, (nxt,)))
+        return frozenset(closure)
 
     # ***** INÍCIO DA MODIFICAÇÃO (Multi-caractere) *****
     def simulate_history(self, input_str: str):
@@ -116,76 +531,139 @@ class Automato:
         if not self.start_state:
             return [], False
 
-        # O histórico armazena (conjunto_de_estados, indice_de_entrada_consumido)
+        # O histórico armazena (conjunto_de_estados, indice_de_entrada_consumido).
+        # Os conjuntos são frozensets imutáveis, guardados sem cópia
         current_states = self.epsilon_closure({self.start_state})
-        history = [(set(current_states), 0)]
+        history = [(current_states, 0)]
         
         input_idx = 0
         
         # Caso especial: entrada vazia
         if not input_str:
-            accepted = any(s in self.final_states for s in current_states)
+            accepted = not self.final_states.isdisjoint(current_states)
             return history, accepted
 
+        # Passos (conjunto, símbolo) já resolvidos são reaproveitados entre iterações
+        # e entre simulações, até a próxima mutação do autômato
+        step_cache = self._subset_step
+        by_src = self._by_src
+        subset_tries = self._subset_trie
+        input_len = len(input_str)
+
         # Loop principal baseado no índice da string, não em caracteres
-        while input_idx < len(input_str):
+        while input_idx < input_len:
             
             # 1. Encontra todas as transições *não-epsilon* que podem ser tomadas
             
-            # Coleta todos os símbolos de transição (ex: "a", "b", "aa", "aba")
-            # que saem dos estados ativos atuais
-            possible_symbols = set()
-            for s in current_states:
-                for (src, sym) in self.transitions.keys():
-                    if src == s and sym != EPSILON:
-                        possible_symbols.add(sym)
-            
-            # Ordena os símbolos do mais longo para o mais curto
-            # Isso garante que "aa" seja tentado antes de "a"
-            sorted_symbols = sorted(list(possible_symbols), key=len, reverse=True)
+            # Os símbolos de transição (ex: "a", "b", "aa", "aba") que saem dos
+            # estados ativos ficam numa trie, montada uma vez por conjunto ativo e
+            # reaproveitada até a próxima mutação
+            trie = subset_tries.get(current_states)
+            if trie is None:
+                possible_symbols = set()
+                for s in current_states:
+                    row = by_src.get(s)
+                    if row:
+                        possible_symbols.update(row)
+                possible_symbols.discard(EPSILON)
+                trie = subset_tries[current_states] = _symbol_trie(possible_symbols)
             
-            consumed_input = False
-            next_states_set = set()
-            remaining_input = input_str[input_idx:]
-            
-            # 2. Tenta encontrar a transição mais longa que corresponde à fita
-            for symbol in sorted_symbols:
-                if remaining_input.startswith(symbol):
-                    # Esta é uma transição válida.
-                    
-                    # Esta é a lógica da função 'move' para este símbolo
-                    for s in current_states:
-                        next_states_set.update(self.transitions.get((s, symbol), set()))
-                    
-                    if next_states_set:
-                        input_idx += len(symbol) # Avança o ponteiro da fita
-                        consumed_input = True
-                        break # Para de verificar (já pegamos a transição mais longa)
+            # 2. Uma única caminhada pela fita acha a transição mais longa que
+            # corresponde (isso garante que "aa" seja escolhido antes de "a")
+            symbol = None
+            node = trie
+            i = input_idx
+            while i < input_len:
+                node = node.get(input_str[i])
+                if node is None:
+                    break
+                i += 1
+                if None in node:
+                    symbol = node[None]
             
-            if not consumed_input:
+            if symbol is None:
                 # Nenhuma transição (nem "a", nem "aa", etc.) correspondeu
                 # ao início da fita. A máquina trava.
                 break
             
-            # 3. Se moveu, calcula o fecho-epsilon dos novos estados
-            current_states = self.epsilon_closure(next_states_set)
-            history.append((set(current_states), input_idx))
+            # Esta é uma transição válida: move + fecho-ε, memorizados por (conjunto, símbolo).
+            # O destino nunca é vazio: o símbolo saiu das arestas dos estados ativos
+            key = (current_states, symbol)
+            next_states = step_cache.get(key)
+            if next_states is None:
+                next_states = self._move_closure(current_states, symbol)
+                step_cache[key] = next_states
+            input_idx += len(symbol) # Avança o ponteiro da fita
+            
+            # 3. O destino já inclui o fecho-epsilon dos novos estados
+            current_states = next_states
+            history.append((current_states, input_idx))
 
-            if not current_states:
-                 # Se o fecho-epsilon for vazio (ex: moveu para um estado sem saída), trava.
-                 break
-        
         # Fim do loop. Verifica aceitação.
         # Aceita se consumiu EXATAMENTE a entrada E está em um estado final
-        accepted = (input_idx == len(input_str)) and any(s in self.final_states for s in current_states)
+        accepted = input_idx == input_len and not self.final_states.isdisjoint(current_states)
         
         return history, accepted
 
     def simulate(self, input_str: str) -> bool:
         """Simulação simples sem histórico."""
-        # A nova simulate_history já calcula a aceitação corretamente
+        # AFDs seguem pela tabela compilada; o caso geral usa simulate_history
+        if self.start_state in self.states and self.is_dfa():
+            return self.simulate_fast(input_str)
         _, accepted = self.simulate_history(input_str)
         return accepted
+
+    def compile_dfa(self) -> CompiledDFA:
+        """Monta (ou reaproveita) a tabela de transições densa do AFD.
+
+        Estado inicial e finais não entram na tabela: a GUI os altera
+        diretamente, então são consultados a cada simulação.
+        """
+        if not self.is_dfa():
+            raise ValueError("A compilação requer um AFD válido.")
+        compiled = self._compiled_dfa
+        if compiled is None:
+            states = sorted(self.states.union(*self.transitions.values()))
+            index = {s: i for i, s in enumerate(states)}
+            sym_idx = {c: k for k, c in enumerate(sorted({sym for (_, sym) in self.transitions}))}
+            width = len(sym_idx)
+            trans = [-1] * (len(states) * width)
+            rows: List[Dict[str, int]] = [{} for _ in states]
+            for (src, sym), dsts in self.transitions.items():
+                dst = index[next(iter(dsts))]
+                trans[index[src] * width + sym_idx[sym]] = dst
+                rows[index[src]][sym] = dst
+            byte_rows = None
+            if all(len(c) == 1 and c.isascii() for c in sym_idx):
+                byte_rows = [[-1] * 128 for _ in states]
+                for byte_row, row in zip(byte_rows, rows):
+                    for sym, dst in row.items():
+                        byte_row[ord(sym)] = dst
+            compiled = self._compiled_dfa = CompiledDFA(states, index, sym_idx, trans, rows,
+                                                        byte_rows)
+        return compiled
+
+    def simulate_fast(self, input_str: str) -> bool:
+        """Simula um AFD pela tabela compilada: uma consulta por caractere."""
+        compiled = self.compile_dfa()
+        state = compiled.index.get(self.start_state)
+        if state is None:
+            # Estado inicial sem transições: só aceita a palavra vazia
+            return not input_str and self.start_state in self.final_states
+        byte_rows = compiled.byte_rows
+        if byte_rows is not None and input_str.isascii():
+            # Entrada e alfabeto ASCII: percorre os bytes, indexando listas direto
+            for byte in input_str.encode("ascii"):
+                state = byte_rows[state][byte]
+                if state < 0:
+                    return False
+            return compiled.states[state] in self.final_states
+        rows = compiled.rows
+        for ch in input_str:
+            state = rows[state].get(ch)
+            if state is None:
+                return False
+        return compiled.states[state] in self.final_states
     # ***** FIM DA MODIFICAÇÃO *****
 
     # -------------------------
@@ -195,15 +673,17 @@ class Automato:
         if not self.start_state:
             return None
 
-        dfa = Automato()
-        start_closure = frozenset(self.epsilon_closure({self.start_state}))
-        unmarked = deque([start_closure])
-        state_map = {start_closure: "q0"}
-        dfa.add_state("q0", is_start=True,
-                      is_final=any(s in self.final_states for s in start_closure))
+        # Subconjuntos de estados do AFND são máscaras de bits (int): o bit i
+        # representa names[i]. União vira `|` e comparação/hash custam O(1)
+        names = sorted(self.states.union((self.start_state,), *self.transitions.values()))
+        index = {s: i for i, s in enumerate(names)}
+
+        def mask_of(group) -> int:
+            mask = 0
+            for s in group:
+                mask |= 1 << index[s]
+            return mask
 
-        count = 1
-        
         # IMPORTANTE: A conversão para AFD assume que o alfabeto
         # é composto de *caracteres únicos*. Se o seu AFND
         # usa "aa", a conversão para AFD padrão não funcionará
@@ -211,31 +691,28 @@ class Automato:
         # Para esta implementação, vamos assumir que a conversão
         # só funciona com alfabetos de símbolos únicos.
         
-        # Coleta o alfabeto de símbolos únicos
-        single_char_alphabet = set()
-        for sym in self.alphabet:
-            for char in sym:
-                single_char_alphabet.add(char)
-
-        while unmarked:
-            T = unmarked.popleft()
-            T_name = state_map[T]
-            for sym in single_char_alphabet: # Usa alfabeto de char único
-                if sym == EPSILON:
-                    continue
-                
-                # A função move precisa ser chamada para o símbolo de char único
-                U = frozenset(self.epsilon_closure(self.move(T, sym)))
-                
-                if not U:
-                    continue
-                if U not in state_map:
-                    state_map[U] = f"q{count}"
-                    dfa.add_state(state_map[U],
-                                  is_final=any(s in self.final_states for s in U))
-                    unmarked.append(U)
-                    count += 1
-                dfa.add_transition(T_name, sym, state_map[U])
+        # Alfabeto de símbolos únicos (guardado no autômato), já sem ε (filtro defensivo:
+        # add_transition nunca põe ε no alfabeto, mas from_json carrega o que vier)
+        symbols = tuple(sorted(self.single_char_alphabet - {EPSILON}))
+
+        # Tabelas por estado, como máscaras: fecho-ε e, por símbolo, o fecho-ε dos
+        # destinos (move já composto com o fecho, calculado uma vez por estado)
+        eps_table = self._epsilon_closure_table()
+        eclose_mask = [mask_of(eps_table.get(s, (s,))) for s in names]
+        step_mask = [[_union_of_bits(mask_of(self.transitions.get((s, sym), ())), eclose_mask)
+                      for s in names]
+                     for sym in symbols]
+        final_mask = mask_of(s for s in self.final_states if s in index)
+
+        order, delta = _subset_construct(eclose_mask[index[self.start_state]], step_mask)
+
+        dfa = Automato()
+        for t, T in enumerate(order):
+            dfa.add_state(f"q{t}", is_start=t == 0, is_final=bool(T & final_mask))
+        for t, row in enumerate(delta):
+            for sym, u in zip(symbols, row): # Usa alfabeto de char único
+                if u >= 0:
+                    dfa.add_transition(f"q{t}", sym, f"q{u}")
         return dfa
 
     def to_regular_grammar(self, strict: bool = False) -> str:
@@ -250,27 +727,34 @@ class Automato:
 
         prods = defaultdict(set)  # state -> set of RHS items (str for EPSILON or (sym, dst))
 
+        # Ordem dos estados e referências locais, reaproveitadas nos laços abaixo
+        order = self.sorted_states()
+        final = self.final_states
+        by_src = self._by_src
+
         # Coleta produções na forma estendida (simbolos podem ser multi-char)
-        for p in sorted(self.states):
+        for p in order:
             closure = self.epsilon_closure({p})
-            if any(s in self.final_states for s in closure):
-                prods[p].add(EPSILON)
+            rhs = prods[p]
+            if not final.isdisjoint(closure):
+                rhs.add(EPSILON)
 
+            # Só as arestas que saem de cada estado do fecho, pelo índice por origem
             for r in closure:
-                for (src, sym), dsts in list(self.transitions.items()):
-                    if src != r or sym == EPSILON:
+                for sym, dsts in by_src.get(r, {}).items():
+                    if sym == EPSILON:
                         continue
                     for dst in dsts:
-                        prods[p].add((sym, dst))
-                        if dst in self.final_states:
-                            prods[p].add((sym, None))
+                        rhs.add((sym, dst))
+                        if dst in final:
+                            rhs.add((sym, None))
 
         # Se não precisa ser estrita, formata e retorna a gramática estendida
         if not strict:
             lines = []
             lines.append("# Gramática Regular gerada (estendida)")
             lines.append(f"# Símbolos terminais: {sorted([s for s in self.alphabet if s != EPSILON])}")
-            lines.append(f"# Não-terminais (estados): {sorted(list(self.states))}")
+            lines.append(f"# Não-terminais (estados): {list(order)}")
             lines.append("")
             lines.append(f"S = {self.start_state}")
             lines.append("")
@@ -282,7 +766,7 @@ class Automato:
                     sym, dst = item
                     return (1, sym, dst or "")
 
-            for p in sorted(self.states):
+            for p in order:
                 rhss = prods.get(p, set())
                 if not rhss:
                     continue
@@ -311,7 +795,7 @@ class Automato:
         nonterminals = set(self.states)
 
         # Processa as produções originais e quebra símbolos longos
-        for p in sorted(self.states):
+        for p in order:
             rhss = prods.get(p, set())
             for item in rhss:
                 if isinstance(item, str):
@@ -349,8 +833,8 @@ class Automato:
                 for ch in sym:
                     terminals.add(ch)
 
-        lines.append(f"# Símbolos terminais: {sorted(list(terminals))}")
-        lines.append(f"# Não-terminais: {sorted(list(nonterminals))}")
+        lines.append(f"# Símbolos terminais: {sorted(terminals)}")
+        lines.append(f"# Não-terminais: {sorted(nonterminals)}")
         lines.append("")
         lines.append(f"S = {self.start_state}")
         lines.append("")
@@ -380,107 +864,146 @@ class Automato:
     # -------------------------
     # Minimização de AFD
     # -------------------------
-    def minimize(self):
-        """Minimiza AFD pelo algoritmo de partições."""
+    def minimize(self, canonical_names: bool = False):
+        """Minimiza AFD pelo algoritmo de partições.
+
+        Por padrão cada estado novo se chama como o grupo que representa ("{q0,q2}").
+        Com `canonical_names=True` os estados viram q0..qk na ordem de uma busca em
+        largura a partir do inicial, o que dá o mesmo resultado para AFDs equivalentes.
+        """
         if not self.is_dfa():
             raise ValueError("A minimização requer um AFD válido.")
 
         # Garante que o AFD é completo
         self._make_complete()
 
-        P = [self.final_states, self.states - self.final_states]
-        W = [self.final_states] if len(self.final_states) <= len(self.states - self.final_states) else [self.states - self.final_states]
-
-
-        while W:
-            A = W.pop(0)
-            for c in self.alphabet:
-                X = {q for q in self.states if self.transitions.get((q, c), set()) and next(iter(self.transitions.get((q,c), set())), None) in A}
-
-                new_P = []
-                for Y in P:
-                    inter = Y & X
-                    diff = Y - X
-                    if inter and diff:
-                        new_P.append(inter)
-                        new_P.append(diff)
-                        if Y in W:
-                            W.remove(Y)
-                            W.append(inter)
-                            W.append(diff)
-                        else:
-                            if len(inter) <= len(diff):
-                                W.append(inter)
-                            else:
-                                W.append(diff)
-                    else:
-                        new_P.append(Y)
-                P = new_P
+        # Estados numerados densamente (0..n-1); cada bloco da partição é um id inteiro,
+        # com class_of[estado] -> bloco e members[bloco] -> estados do bloco. Só entram
+        # os estados alcançáveis a partir do inicial (o próprio autômato não é alterado)
+        reachable = self._reachable_states()
+        states = tuple(s for s in self.sorted_states() if s in reachable)
+        index = {s: i for i, s in enumerate(states)}
+        # Símbolos tirados das próprias transições: o alfabeto pode guardar símbolos
+        # que já não têm arestas e um JSON carregado pode ter arestas com símbolos fora
+        # dele (que _make_complete não completa)
+        symbols = sorted({sym for (_, sym) in self.transitions})
+        # Aresta ausente vai para o estado de erro; sem ele, para um sumidouro virtual
+        # (índice n, não final) que só existe na tabela. Lido com .get: o defaultdict
+        # criaria conjuntos vazios em `transitions`
+        error_state_name = "_error"
+        error_idx = index.get(error_state_name, len(states))
+        transitions = self.transitions
+        delta = []
+        for s in states:
+            row = []
+            for c in symbols:
+                dsts = transitions.get((s, c))
+                row.append(index[next(iter(dsts))] if dsts else error_idx)
+            delta.append(row)
+        is_final = [s in self.final_states for s in states]
+        if error_idx == len(states) and any(error_idx in row for row in delta):
+            delta.append([error_idx] * len(symbols))
+            is_final.append(False)
+        class_of, members = _hopcroft(delta, is_final)
+
+        # Membros de cada bloco já em ordem alfabética: uma passada pelos estados ordenados
+        P: List[List[str]] = [[] for _ in members]
+        for i, s in enumerate(states):
+            P[class_of[i]].append(s)
+        # Início e finais resolvidos por bloco: um bloco nunca mistura finais e não
+        # finais, então basta olhar o primeiro membro
+        start_block = class_of[index[self.start_state]] if self.start_state in index else -1
+        final_block = [is_final[group[0]] for group in members]
 
         # Remove o estado de erro, se existir
-        error_state_name = "_error"
         if error_state_name in self.states:
             self.remove_state(error_state_name)
-            # Refaz as partições sem o estado de erro
-            P = [p - {error_state_name} for p in P if p - {error_state_name}]
-
+            # Refaz as partições sem o estado de erro (mantendo os ids de bloco)
+            P = [[s for s in group if s != error_state_name] for group in P]
+
+
+        # Arestas entre blocos: |blocos|·|Σ|, tiradas da tabela delta. Num AFD todos os
+        # membros de um bloco levam ao mesmo bloco, então basta o primeiro membro cuja
+        # aresta não vá para o estado de erro removido ou o sumidouro (-1 = sem aresta)
+        block_delta: List[List[int]] = []
+        for group in members:
+            row = []
+            for k in range(len(symbols)):
+                j = next((delta[i][k] for i in group
+                          if i != error_idx and delta[i][k] != error_idx), -1)
+                row.append(class_of[j] if j >= 0 else -1)
+            block_delta.append(row)
+
+        # Ignora grupos vazios que podem surgir da remoção do estado de erro
+        order = [block for block, group in enumerate(P) if group]
+        block_name: List[Optional[str]] = [None] * len(P)
+        if canonical_names:
+            # q0..qk na ordem da BFS a partir do bloco inicial, símbolos em ordem
+            bfs = [start_block] if start_block >= 0 and P[start_block] else []
+            seen = set(bfs)
+            t = 0
+            while t < len(bfs):
+                for u in block_delta[bfs[t]]:
+                    if u >= 0 and u not in seen:
+                        seen.add(u)
+                        bfs.append(u)
+                t += 1
+            order = bfs + [block for block in order if block not in seen]
+            for i, block in enumerate(order):
+                block_name[block] = f"q{i}"
+        else:
+            for block in order:
+                group = P[block]
+                # Escolhe um nome de estado representativo (o primeiro em ordem alfabética)
+                rep_name = group[0]
+                block_name[block] = f"{{{','.join(group)}}}" if len(group) > 1 else rep_name
 
         newDFA = Automato()
-        state_map = {}
-        
-        # Filtra grupos vazios que podem surgir da remoção do estado de erro
-        P = [group for group in P if group]
+        for block in order:
+            newDFA.add_state(block_name[block],
+                             is_start=block == start_block,
+                             is_final=final_block[block])
 
-        for i, group in enumerate(P):
-            if not group: continue
-            
-            # Escolhe um nome de estado representativo (o primeiro em ordem alfabética)
-            rep_name = sorted(list(group))[0]
-            new_name = f"{{{','.join(sorted(list(group)))}}}" if len(group) > 1 else rep_name
-            
-            for s in group:
-                state_map[s] = new_name
-            
-            newDFA.add_state(new_name,
-                             is_start=self.start_state in group,
-                             is_final=bool(self.final_states & group))
-
-        # Adiciona transições ao novo AFD
-        processed_transitions = set()
-        for (src, sym), dsts in self.transitions.items():
-            if src in state_map and (state_map[src], sym) not in processed_transitions:
-                dst = next(iter(dsts)) # É um DFA, então só há um destino
-                if dst in state_map:
-                    newDFA.add_transition(state_map[src], sym, state_map[dst])
-                    processed_transitions.add((state_map[src], sym))
+        for block in order:
+            for sym, u in zip(symbols, block_delta[block]):
+                if u >= 0:
+                    newDFA.add_transition(block_name[block], sym, block_name[u])
 
         return newDFA
 
+    def _reachable_states(self) -> Set[str]:
+        """Estados alcançáveis a partir do inicial (todos, se não houver inicial)."""
+        if self.start_state not in self.states:
+            return set(self.states)
+        seen = {self.start_state}
+        queue = deque(seen)
+        while queue:
+            for dsts in self._by_src.get(queue.popleft(), {}).values():
+                for dst in dsts:
+                    if dst not in seen:
+                        seen.add(dst)
+                        queue.append(dst)
+        return seen
+
     def _make_complete(self):
         """Adiciona um estado de erro para tornar o AFD completo, se necessário."""
         error_state_name = "_error"
-        has_incomplete_transitions = False
         
         # Minimização também só funciona com alfabeto de char único
-        single_char_alphabet = set()
-        for sym in self.alphabet:
-            for char in sym:
-                single_char_alphabet.add(char)
-
-        for s in self.states:
-            for sym in single_char_alphabet:
-                if not self.transitions.get((s, sym)):
-                    has_incomplete_transitions = True
-                    break
-            if has_incomplete_transitions:
-                break
-        
-        if has_incomplete_transitions:
+        alpha = tuple(self.single_char_alphabet)
+
+        # Pares (estado, símbolo) sem destino, numa única diferença de conjuntos
+        # (remoções apagam as chaves vazias, então chave presente = tem destino)
+        missing = {(s, sym) for s in self.states for sym in alpha}
+        missing -= self.transitions.keys()
+        if not missing:
+            return
+
+        if error_state_name not in self.states:
             self.add_state(error_state_name)
-            for s in list(self.states): # Itera sobre uma cópia
-                 for sym in single_char_alphabet:
-                    if not self.transitions.get((s,sym)):
-                        self.add_transition(s, sym, error_state_name)
+            missing.update((error_state_name, sym) for sym in alpha)
+        for s, sym in missing:
+            self.add_transition(s, sym, error_state_name)
 
 
     # -------------------------
@@ -488,13 +1011,16 @@ class Automato:
     # -------------------------
     def is_dfa(self) -> bool:
         """Verifica se é um AFD válido."""
-        for (src, sym), dsts in self.transitions.items():
-            if len(dsts) != 1: return False
-            if sym == EPSILON: return False
-            # Um DFA verdadeiro não deve ter símbolos multi-caractere
-            if len(sym) > 1: return False 
-        
-        return True
+        if self._is_dfa is not None:
+            return self._is_dfa
+        self._is_dfa = self._scan_is_dfa()
+        return self._is_dfa
+
+    def _scan_is_dfa(self) -> bool:
+        # Uma passada só, parando na primeira violação: destino único, sem ε e sem
+        # símbolos multi-caractere (um DFA verdadeiro não deve tê-los)
+        return all(len(dsts) == 1 and len(sym) <= 1 and sym != EPSILON
+                   for (_, sym), dsts in self.transitions.items())
 
     # -------------------------
     # Serialização / Exportação
@@ -509,7 +1035,7 @@ class Automato:
 
         # Define posições para evitar sobreposição (layout simples)
         # Este é um layout de exemplo, a GUI usa posições definidas pelo usuário
-        nodes = sorted(list(self.states))
+        nodes = self.sorted_states()
         for i, s in enumerate(nodes):
             opts = ["state"]
             if s == self.start_state:
@@ -519,40 +1045,49 @@ class Automato:
             
             # Escapa caracteres especiais para o LaTeX
             display_s = s.replace("_", "\\_")
-            tikz.append(f"\\node[{','.join(opts)}] ({s}) [right of=q{i-1} if i > 0 else base] {{${display_s}$}};")
+            # O primeiro nó é a âncora; os demais ficam à direita do anterior
+            position = f" [right of={nodes[i-1]}]" if i > 0 else ""
+            tikz.append(f"\\node[{','.join(opts)}] ({s}){position} {{${display_s}$}};")
 
         # Agrupa transições para arcos curvos ou laços
-        edge_labels = defaultdict(list)
-        for (src, sym), dsts in self.transitions.items():
-            for dst in dsts:
-                edge_labels[(src, dst)].append(sym)
-        
-        for (src, dst), symbols in edge_labels.items():
-            # Escapa símbolos para LaTeX (ex: "aa" vira "aa", "&" vira \epsilon)
-            processed_symbols = []
-            for s in sorted(symbols):
-                if s == EPSILON:
-                    processed_symbols.append("\\epsilon")
-                else:
-                    processed_symbols.append(s.replace("_", "\\_"))
+        edge_labels = self.edge_symbols()
 
-            label = ",".join(processed_symbols)
+        # Cada símbolo é escapado uma única vez, não a cada aresta em que aparece
+        escaped = {sym: "\\epsilon" if sym == EPSILON else sym.replace("_", "\\_")
+                   for (_, sym) in self.transitions}
+        
+        # Pares com aresta de volta e rótulos já escapados, calculados uma vez
+        reverse_pairs = {(dst, src) for (src, dst) in edge_labels}
+        label_str = {
+            pair: ",".join([escaped[sym] for sym in sorted(symbols)])
+            for pair, symbols in edge_labels.items()
+        }
 
+        for (src, dst), label in label_str.items():
             if src == dst:
                 tikz.append(f"\\path ({src}) edge [loop above] node {{${label}$}} ();")
+            elif (src, dst) in reverse_pairs:
+                # Existe uma transição de volta: curva o arco
+                tikz.append(f"\\path ({src}) edge [bend left] node {{${label}$}} ({dst});")
             else:
-                # Verifica se existe uma transição de volta para curvar o arco
-                if (dst, src) in edge_labels:
-                    tikz.append(f"\\path ({src}) edge [bend left] node {{${label}$}} ({dst});")
-                else:
-                    tikz.append(f"\\path ({src}) edge node {{${label}$}} ({dst});")
-
+                tikz.append(f"\\path ({src}) edge node {{${label}$}} ({dst});")
 
         tikz.append("\\end{tikzpicture}")
         tikz.append("\\end{document}")
         return "\n".join(tikz)
 
-    def to_json(self) -> str:
+    def _cache_key(self) -> tuple:
+        return (self.start_state, frozenset(self.states), frozenset(self.final_states),
+                frozenset(self.alphabet))
+
+    def to_dict(self) -> dict:
+        """Retorna o autômato como dicionário serializável (a mesma estrutura do JSON).
+
+        Sem mutações desde a última chamada, devolve o mesmo objeto: trate-o como somente leitura.
+        """
+        key = self._cache_key()
+        if self._dict_cache is not None and self._dict_cache[0] == key:
+            return self._dict_cache[1]
         data = {
             "states": list(self.states),
             "start_state": self.start_state,
@@ -563,22 +1098,51 @@ class Automato:
                 for (src, sym), dsts in self.transitions.items()
             ],
         }
-        return json.dumps(data, indent=2)
+        self._dict_cache = (key, data)
+        return data
+
+    def to_json(self) -> str:
+        # Sem mutações desde a última chamada, devolve o texto já serializado
+        key = self._cache_key()
+        if self._json_cache is not None and self._json_cache[0] == key:
+            return self._json_cache[1]
+
+        data = self.to_dict()
+        if orjson is not None:
+            text = orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+        else:
+            text = json.dumps(data, indent=2)
+        self._json_cache = (key, text)
+        return text
     
     @classmethod
-    def from_json(cls, json_str: str):
-        data = json.loads(json_str)
+    def from_json(cls, json_str: str, validate: bool = False):
+        # orjson.JSONDecodeError herda de json.JSONDecodeError: quem chama trata igual
+        data = orjson.loads(json_str) if orjson is not None else json.loads(json_str)
+        return cls.from_dict(data, validate)
+
+    @classmethod
+    def from_dict(cls, data: dict, validate: bool = False):
+        """Reconstrói o autômato (a partir do dicionário de to_dict) atribuindo os conjuntos diretamente.
+
+        Com `validate=True`, confere ao final (uma única passada) se todas as
+        transições ligam estados existentes. O dicionário não é alterado.
+        """
         a = cls()
-        a.states = set(data.get("states", []))
+        a.states = set(data.get("states") or ())
+        a._state_order = None
         a.start_state = data.get("start_state")
-        a.final_states = set(data.get("final_states", []))
-        a.alphabet = set(data.get("alphabet", []))
+        a.final_states = set(data.get("final_states") or ())
+        a.alphabet = set(data.get("alphabet") or ())
         
-        transitions_data = data.get("transitions", [])
-        a.transitions = defaultdict(set)
-        for t in transitions_data:
-            src = t["src"]
-            sym = t["symbol"]
-            for dst in t["dsts"]:
-                a.transitions[(src, sym)].add(dst)
-        return a
\ No newline at end of file
+        # to_json grava uma entrada por (origem, símbolo), mas arquivos antigos ou
+        # escritos à mão podem repetir a chave: os destinos são unidos, não substituídos
+        transitions = a.transitions
+        for t in data.get("transitions") or ():
+            transitions[(t["src"], t["symbol"])].update(t["dsts"])
+        if validate:
+            endpoints = {src for (src, _) in a.transitions}.union(*a.transitions.values())
+            if not endpoints <= a.states:
+                raise ValueError("Estado inexistente.")
+        a._rebuild_index()
+        return a
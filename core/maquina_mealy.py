@@ -51,12 +51,11 @@ class MaquinaMealy:
         if self.start_state == state_to_remove:
             self.start_state = None
 
-        # Filtra as transições que envolvam o estado removido
-        new_transitions = {}
-        for (src, in_sym), (dst, out_sym) in self.transitions.items():
-            if src != state_to_remove and dst != state_to_remove:
-                new_transitions[(src, in_sym)] = (dst, out_sym)
-        self.transitions = new_transitions
+        # Apaga no próprio dicionário as transições que envolvam o estado removido
+        stale = [key for key, (dst, _) in self.transitions.items()
+                 if key[0] == state_to_remove or dst == state_to_remove]
+        for key in stale:
+            del self.transitions[key]
 
     def remove_transition(self, src: str, input_symbol: str):
         """Remove uma transição específica baseada na origem e no símbolo de entrada."""
@@ -77,12 +76,15 @@ class MaquinaMealy:
         if self.start_state == old_name:
             self.start_state = new_name
 
-        new_transitions = {}
-        for (src, in_sym), (dst, out_sym) in self.transitions.items():
+        # Reescreve no próprio dicionário só as entradas que citam o estado
+        affected = [(key, value) for key, value in self.transitions.items()
+                    if key[0] == old_name or value[0] == old_name]
+        for key, _ in affected:
+            del self.transitions[key]
+        for (src, in_sym), (dst, out_sym) in affected:
             new_src = new_name if src == old_name else src
             new_dst = new_name if dst == old_name else dst
-            new_transitions[(new_src, in_sym)] = (new_dst, out_sym)
-        self.transitions = new_transitions
+            self.transitions[(new_src, in_sym)] = (new_dst, out_sym)
 
     # -------------------------
     # Simulação
@@ -122,7 +124,7 @@ class MaquinaMealy:
                     possible_symbols.add(sym)
 
             # 2. Ordena do mais longo para o mais curto (ex: "aa" antes de "a")
-            sorted_symbols = sorted(list(possible_symbols), key=len, reverse=True)
+            sorted_symbols = sorted(possible_symbols, key=len, reverse=True)
 
             remaining_input = input_str[input_idx:]
             consumed = False
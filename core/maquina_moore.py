@@ -2,6 +2,14 @@ from collections import defaultdict
 from typing import Dict, Set, Tuple, Optional, List
 import json
 
+try:
+    # Serializador em C, opcional: se não estiver instalado, usa o json padrão
+    import orjson
+except ImportError:
+    orjson = None
+
+from core.automato import CompiledDFA, _symbol_trie
+
 EPSILON = "&"
 
 class MaquinaMoore:
@@ -19,6 +27,83 @@ class MaquinaMoore:
         self.output_function: Dict[str, str] = {}
         # Mapeia (estado_origem, simbolo_entrada) para estado_destino
         self.transitions: Dict[Tuple[str, str], str] = {}
+        # Índices mantidos junto com `transitions`: estado -> chaves (origem, símbolo)
+        # que saem dele / que chegam nele
+        self._by_src: Dict[str, Set[Tuple[str, str]]] = {}
+        self._by_dst: Dict[str, Set[Tuple[str, str]]] = {}
+        # Trie dos símbolos que saem de cada estado (ver _symbol_trie).
+        # Montada sob demanda pela simulação e descartada a cada mutação
+        self._input_tries: Optional[Dict[str, dict]] = None
+        # Tabela densa usada quando todos os símbolos têm um caractere (ver _compile_tables).
+        # _tables_dirty diferencia "ainda não montada" de "não se aplica" (None)
+        self._tables: Optional[CompiledDFA] = None
+        self._tables_dirty: bool = True
+        # Último JSON gerado, junto com a chave usada. A GUI altera estado inicial e
+        # função de saída diretamente, por isso eles entram na chave
+        self._json_cache: Optional[Tuple[tuple, str]] = None
+
+    def _invalidate_caches(self):
+        """Descarta as estruturas derivadas das transições (recalculadas sob demanda)."""
+        self._input_tries = None
+        self._tables_dirty = True
+        self._json_cache = None
+
+    def _compile_tables(self) -> Optional[CompiledDFA]:
+        """Numera os estados densamente e monta uma linha caractere -> estado por estado.
+
+        Só se aplica quando todo símbolo de entrada tem exatamente um caractere; nos
+        demais casos retorna None e a simulação usa as tries. A função de saída e o
+        estado inicial ficam fora da tabela: a GUI os altera diretamente.
+        """
+        if self._tables_dirty:
+            self._tables = None
+            if all(len(sym) == 1 for (_, sym) in self.transitions):
+                states = sorted(self.states.union(self.transitions.values()))
+                index = {s: i for i, s in enumerate(states)}
+                sym_idx = {c: k for k, c in enumerate(sorted({sym for (_, sym) in self.transitions}))}
+                width = len(sym_idx)
+                trans = [-1] * (len(states) * width)
+                rows: List[Dict[str, int]] = [{} for _ in states]
+                for (src, sym), dst in self.transitions.items():
+                    trans[index[src] * width + sym_idx[sym]] = index[dst]
+                    rows[index[src]][sym] = index[dst]
+                self._tables = CompiledDFA(states, index, sym_idx, trans, rows)
+            self._tables_dirty = False
+        return self._tables
+
+    def _build_input_tries(self) -> Dict[str, dict]:
+        """Agrupa os símbolos de entrada por estado de origem, numa trie por estado."""
+        tries = self._input_tries
+        if tries is None:
+            out_syms = defaultdict(list)
+            for (src, sym) in self.transitions:
+                out_syms[src].append(sym)
+            tries = self._input_tries = {src: _symbol_trie(syms) for src, syms in out_syms.items()}
+        return tries
+
+    def _rebuild_index(self):
+        """Reconstrói os índices por origem/destino a partir de `transitions`."""
+        self._by_src = {}
+        self._by_dst = {}
+        for key, dst in self.transitions.items():
+            self._by_src.setdefault(key[0], set()).add(key)
+            self._by_dst.setdefault(dst, set()).add(key)
+
+    def _set_transition(self, key: Tuple[str, str], dst: str):
+        """Grava uma transição em `transitions` e nos índices por origem/destino."""
+        old_dst = self.transitions.get(key)
+        if old_dst is not None:
+            self._by_dst[old_dst].discard(key)
+        self.transitions[key] = dst
+        self._by_src.setdefault(key[0], set()).add(key)
+        self._by_dst.setdefault(dst, set()).add(key)
+
+    def _drop_transition(self, key: Tuple[str, str]) -> str:
+        """Apaga uma transição de `transitions` e dos índices; retorna o destino."""
+        dst = self.transitions.pop(key)
+        self._by_src.get(key[0], set()).discard(key)
+        self._by_dst.get(dst, set()).discard(key)
+        return dst
 
     def add_state(self, state: str, output_symbol: str, is_start: bool = False):
         """Adiciona um novo estado com seu símbolo de saída."""
@@ -34,7 +119,8 @@ class MaquinaMoore:
             raise ValueError(f"Estado de origem '{src}' ou destino '{dst}' não existe.")
         
         self.input_alphabet.add(input_symbol)
-        self.transitions[(src, input_symbol)] = dst
+        self._set_transition((src, input_symbol), dst)
+        self._invalidate_caches()
 
     def remove_state(self, state_to_remove: str):
         """Remove um estado e todas as suas transições associadas."""
@@ -48,11 +134,11 @@ class MaquinaMoore:
         if self.start_state == state_to_remove:
             self.start_state = None
 
-        new_transitions = {}
-        for (src, in_sym), dst in self.transitions.items():
-            if src != state_to_remove and dst != state_to_remove:
-                new_transitions[(src, in_sym)] = dst
-        self.transitions = new_transitions
+        # Apaga no próprio dicionário só as transições que os índices ligam ao estado
+        stale = self._by_src.pop(state_to_remove, set()) | self._by_dst.pop(state_to_remove, set())
+        for key in stale:
+            self._drop_transition(key)
+        self._invalidate_caches()
 
     def rename_state(self, old_name: str, new_name: str):
         """Renomeia um estado em toda a estrutura da máquina."""
@@ -69,18 +155,21 @@ class MaquinaMoore:
 
         self.output_function[new_name] = self.output_function.pop(old_name)
 
-        new_transitions = {}
-        for (src, in_sym), dst in self.transitions.items():
+        # Reescreve no próprio dicionário só as entradas que os índices ligam ao estado
+        stale = self._by_src.pop(old_name, set()) | self._by_dst.pop(old_name, set())
+        affected = [(key, self._drop_transition(key)) for key in stale]
+        for (src, in_sym), dst in affected:
             new_src = new_name if src == old_name else src
             new_dst = new_name if dst == old_name else dst
-            new_transitions[(new_src, in_sym)] = new_dst
-        self.transitions = new_transitions
+            self._set_transition((new_src, in_sym), new_dst)
+        self._invalidate_caches()
         
     def remove_transition(self, src: str, input_symbol: str):
         """Remove uma transição específica baseada na origem e no símbolo de entrada."""
         key = (src, input_symbol)
         if key in self.transitions:
-            del self.transitions[key]
+            self._drop_transition(key)
+            self._invalidate_caches()
 
     # ***** INÍCIO DA MODIFICAÇÃO (Multi-caractere) *****
     def simulate_history(self, input_str: str) -> Tuple[List[Tuple[str, str, int]], Optional[str]]:
@@ -104,84 +193,127 @@ class MaquinaMoore:
         # O histórico começa com o estado inicial, sua saída e índice 0
         history = [(current_state, output_str, 0)]
 
-        while input_idx < len(input_str):
-            # 1. Encontra todas as transições que saem do estado atual
-            possible_symbols = set()
-            for (src, sym) in self.transitions.keys():
-                if src == current_state:
-                    possible_symbols.add(sym)
-
-            # 2. Ordena do mais longo para o mais curto
-            sorted_symbols = sorted(list(possible_symbols), key=len, reverse=True)
-
-            remaining_input = input_str[input_idx:]
-            consumed = False
-
-            # 3. Tenta encontrar a transição mais longa que bate com a fita
-            for symbol in sorted_symbols:
-                if remaining_input.startswith(symbol):
-                    # Transição encontrada
-                    next_state = self.transitions[(current_state, symbol)]
-                    
-                    # Adiciona a saída do *novo* estado à string de saída
-                    output_str += self.output_function.get(next_state, '') 
-                    
-                    current_state = next_state
-                    input_idx += len(symbol) # Avança o índice
-                    
-                    history.append((current_state, output_str, input_idx))
-                    consumed = True
-                    break # Para de procurar
-
-            if not consumed:
+        output_of = self.output_function.get
+
+        # Símbolos de um caractere: cada passo é uma consulta na linha do estado
+        compiled = self._compile_tables()
+        if compiled is not None:
+            names = compiled.states
+            rows = compiled.rows
+            state = compiled.index.get(current_state)
+            for input_idx, ch in enumerate(input_str, 1):
+                state = rows[state].get(ch) if state is not None else None
+                if state is None:
+                    # Nenhuma transição encontrada, máquina trava
+                    return history, None
+                current_state = names[state]
+                output_str += output_of(current_state, '')
+                history.append((current_state, output_str, input_idx))
+            return history, output_str
+
+        # 1. Símbolos que saem de cada estado, numa trie por estado: uma passada
+        # pelas transições, reaproveitada até a próxima mutação
+        tries = self._build_input_tries()
+        transition = self.transitions.__getitem__
+        input_len = len(input_str)
+
+        while input_idx < input_len:
+            # 2. Uma caminhada pela fita acha a transição mais longa que bate
+            symbol = None
+            node = tries.get(current_state)
+            i = input_idx
+            while node is not None and i < input_len:
+                node = node.get(input_str[i])
+                if node is None:
+                    break
+                i += 1
+                if None in node:
+                    symbol = node[None]
+
+            if symbol is None:
                 # Nenhuma transição encontrada, máquina trava
                 return history, None
+
+            # Transição encontrada
+            next_state = transition((current_state, symbol))
+
+            # Adiciona a saída do *novo* estado à string de saída
+            output_str += output_of(next_state, '')
+
+            current_state = next_state
+            input_idx += len(symbol) # Avança o índice
+
+            history.append((current_state, output_str, input_idx))
         
         # Fim da simulação
         return history, output_str
     # ***** FIM DA MODIFICAÇÃO *****
 
-    def to_json(self) -> str:
-        """Serializa a máquina para uma string JSON."""
+    def to_dict(self) -> dict:
+        """Retorna a máquina como dicionário serializável (a mesma estrutura do JSON)."""
         # Filtra input_alphabet e output_alphabet para remover None, se houver
-        input_alpha = list(filter(None, self.input_alphabet))
-        output_alpha = list(filter(None, self.output_alphabet))
+        input_alpha = [x for x in self.input_alphabet if x]
+        output_alpha = [x for x in self.output_alphabet if x]
         
-        data = {
+        return {
             "states": list(self.states),
             "start_state": self.start_state,
             "input_alphabet": input_alpha, # Usando a lista filtrada
             "output_alphabet": output_alpha, # Usando a lista filtrada
-            "output_function": self.output_function,
+            "output_function": dict(self.output_function),
             "transitions": [
                 {"src": src, "input": in_sym, "dst": dst}
                 for (src, in_sym), dst in self.transitions.items()
             ],
         }
-        return json.dumps(data, indent=2, ensure_ascii=False)
+
+    def to_json(self) -> str:
+        """Serializa a máquina para uma string JSON."""
+        # Sem mutações desde a última chamada, devolve o texto já serializado
+        key = (self.start_state, frozenset(self.states), frozenset(self.output_function.items()),
+               frozenset(self.input_alphabet), frozenset(self.output_alphabet))
+        if self._json_cache is not None and self._json_cache[0] == key:
+            return self._json_cache[1]
+        text = json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+        self._json_cache = (key, text)
+        return text
 
     @classmethod
     def from_json(cls, json_str: str) -> 'MaquinaMoore':
         """Cria uma Máquina de Moore a partir de uma string JSON."""
-        data = json.loads(json_str)
+        return cls.from_dict(json.loads(json_str))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MaquinaMoore':
+        """Cria uma Máquina de Moore a partir do dicionário gerado por to_dict."""
         machine = cls()
         
-        output_func = data.get("output_function", {})
-        for state, output in output_func.items():
-            machine.add_state(state, output, is_start=(state == data.get("start_state")))
+        # Estados e saídas atribuídos de uma vez, sem passar por add_state
+        output_func = data.get("output_function") or {}
+        machine.output_function = dict(output_func)
+        machine.states = set(output_func)
+        start_state = data.get("start_state")
+        # Como em add_state: sem inicial válido salvo, o primeiro estado assume
+        machine.start_state = start_state if start_state in machine.states else next(iter(output_func), None)
         
         # Recalcula alfabetos a partir das transições e função de saída
-        machine.input_alphabet = set()
         machine.output_alphabet = set(output_func.values())
 
-        for t in data.get("transitions", []):
+        states = machine.states
+        transitions = machine.transitions
+        input_alphabet = machine.input_alphabet
+        for t in data.get("transitions") or ():
             try:
-                # Adiciona e atualiza o alfabeto de entrada
-                machine.add_transition(t["src"], t["input"], t["dst"])
+                src, in_sym, dst = t["src"], t["input"], t["dst"]
             except KeyError as e:
                 print(f"Aviso: Ignorando transição malformada (chave faltando: {e}): {t}")
-            except ValueError as e:
-                 print(f"Aviso: Ignorando transição inválida ({e}): {t}")
+                continue
+            if src not in states or dst not in states:
+                print(f"Aviso: Ignorando transição inválida (Estado de origem '{src}' ou destino '{dst}' não existe.): {t}")
+                continue
+            transitions[(src, in_sym)] = dst
+            input_alphabet.add(in_sym)
+        machine._rebuild_index()
 
         # Garante que start_state é válido
         if machine.start_state not in machine.states:
@@ -197,20 +329,22 @@ class MaquinaMoore:
 def snapshot_of_moore(machine: MaquinaMoore, positions: Dict[str, Tuple[int, int]]) -> str:
     """Retorna JSON serializável representando o estado completo (máquina + posições)."""
     data = {
-        "moore_machine": json.loads(machine.to_json()),
+        "moore_machine": machine.to_dict(),
         "positions": positions
     }
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
     return json.dumps(data, ensure_ascii=False)
 
 def restore_from_moore_snapshot(s: str) -> Tuple[MaquinaMoore, Dict[str, Tuple[int, int]]]:
     """Restaura uma máquina de Moore e suas posições a partir de um snapshot JSON."""
-    data = json.loads(s)
+    data = orjson.loads(s) if orjson is not None else json.loads(s)
     
     # Garante que o objeto da máquina seja um dicionário antes de passar para from_json
     machine_data = data.get("moore_machine", {})
     if isinstance(machine_data, str):
         machine_data = json.loads(machine_data)
 
-    machine = MaquinaMoore.from_json(json.dumps(machine_data))
+    machine = MaquinaMoore.from_dict(machine_data)
     positions = data.get("positions", {})
     return machine, positions
\ No newline at end of file
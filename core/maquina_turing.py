@@ -65,12 +65,11 @@ class MaquinaTuring:
 
         self.final_states.discard(state_to_remove)
 
-        # Filtra transições
-        new_transitions = {}
-        for (src, read), (dst, write, move) in self.transitions.items():
-            if src != state_to_remove and dst != state_to_remove:
-                new_transitions[(src, read)] = (dst, write, move)
-        self.transitions = new_transitions
+        # Filtra transições, apagando no próprio dicionário
+        stale = [key for key, (dst, _, _) in self.transitions.items()
+                 if key[0] == state_to_remove or dst == state_to_remove]
+        for key in stale:
+            del self.transitions[key]
         
     def rename_state(self, old_name: str, new_name: str):
         """Renomeia um estado em toda a estrutura da máquina."""
@@ -89,12 +88,15 @@ class MaquinaTuring:
             self.final_states.remove(old_name)
             self.final_states.add(new_name)
 
-        new_transitions = {}
-        for (src, read), (dst, write, move) in self.transitions.items():
+        # Reescreve no próprio dicionário só as entradas que citam o estado
+        affected = [(key, value) for key, value in self.transitions.items()
+                    if key[0] == old_name or value[0] == old_name]
+        for key, _ in affected:
+            del self.transitions[key]
+        for (src, read), (dst, write, move) in affected:
             new_src = new_name if src == old_name else src
             new_dst = new_name if dst == old_name else dst
-            new_transitions[(new_src, read)] = (new_dst, write, move)
-        self.transitions = new_transitions
+            self.transitions[(new_src, read)] = (new_dst, write, move)
 
     def simulate_history(self, input_str: str, max_steps=DEFAULT_MAX_STEPS) -> Tuple[List[Tuple[str, Dict[int, str], int]], str]:
         """
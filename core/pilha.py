@@ -1,7 +1,15 @@
-from collections import defaultdict
-from typing import Dict, Set, Tuple, Optional, List
+from collections import defaultdict, deque
+from typing import Dict, Set, FrozenSet, Tuple, Optional, List
 import json
 
+try:
+    # Serializador em C, opcional: se não estiver instalado, usa o json padrão
+    import orjson
+except ImportError:
+    orjson = None
+
+from core.automato import _symbol_trie
+
 EPSILON = "&"
 
 class AutomatoPilha:
@@ -17,6 +25,56 @@ class AutomatoPilha:
         self.final_states: Set[str] = set()
         # Mapeia (estado, simbolo_entrada, simbolo_pilha_topo) para um conjunto de (novo_estado, simbolos_a_empilhar)
         self.transitions: Dict[Tuple[str, str, str], Set[Tuple[str, str]]] = defaultdict(set)
+        # Índices mantidos junto com `transitions`: estado -> chaves que saem dele e
+        # estado -> chaves com algum destino nele. O índice por destino pode guardar
+        # chaves que já não apontam para o estado; quem o usa confere os destinos
+        self._by_src: Dict[str, Set[Tuple[str, str, str]]] = {}
+        self._by_dst: Dict[str, Set[Tuple[str, str, str]]] = {}
+        # Trie dos símbolos de entrada não-ε (ver _symbol_trie), montada sob demanda
+        # pela simulação e descartada a cada mutação
+        self._input_trie: Optional[dict] = None
+        # Fecho-ε de cada par (estado, pilha) já visitado. O índice da entrada não
+        # influencia as transições ε, então fica fora da chave
+        self._eps_cache: Dict[Tuple[str, Tuple[str, ...]], FrozenSet[Tuple[str, Tuple[str, ...]]]] = {}
+        # Pilhas já construídas pela simulação: pilhas iguais passam a ser o mesmo
+        # objeto, e a comparação em conjuntos para na identidade
+        self._stack_intern: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        # Transições pré-processadas (ver _move_table)
+        self._moves: Optional[Dict[Tuple[str, str, str], List[Tuple[str, Tuple[str, ...]]]]] = None
+        # Último JSON gerado, junto com a chave usada. A GUI altera estado inicial e
+        # estados finais diretamente, por isso eles entram na chave
+        self._json_cache: Optional[Tuple[tuple, str]] = None
+
+    def _invalidate_caches(self):
+        """Descarta as estruturas derivadas das transições (recalculadas sob demanda)."""
+        self._input_trie = None
+        self._eps_cache = {}
+        self._stack_intern = {}
+        self._moves = None
+        self._json_cache = None
+
+    def _rebuild_index(self):
+        """Reconstrói os índices por origem/destino a partir de `transitions`."""
+        self._by_src = {}
+        self._by_dst = {}
+        for key, destinations in self.transitions.items():
+            self._by_src.setdefault(key[0], set()).add(key)
+            for dst, _ in destinations:
+                self._by_dst.setdefault(dst, set()).add(key)
+
+    def _move_table(self) -> Dict[Tuple[str, str, str], List[Tuple[str, Tuple[str, ...]]]]:
+        """Copia `transitions` com os símbolos a empilhar já convertidos em tupla.
+
+        Com a tupla pronta (vazia para ε), a simulação só concatena pilhas, sem
+        converter strings a cada passo. Chaves sem destinos ficam de fora.
+        """
+        table = self._moves
+        if table is None:
+            table = self._moves = {
+                key: [(dst, () if push == EPSILON else tuple(push)) for dst, push in destinations]
+                for key, destinations in self.transitions.items() if destinations
+            }
+        return table
 
     def add_state(self, state: str, is_start: bool = False, is_final: bool = False):
         self.states.add(state)
@@ -45,7 +103,11 @@ class AutomatoPilha:
         # Garante que start_stack_symbol esteja no alfabeto da pilha
         self.stack_alphabet.add(self.start_stack_symbol)
 
-        self.transitions[(src, input_sym, pop_sym)].add((dst, push_syms))
+        key = (src, input_sym, pop_sym)
+        self.transitions[key].add((dst, push_syms))
+        self._by_src.setdefault(src, set()).add(key)
+        self._by_dst.setdefault(dst, set()).add(key)
+        self._invalidate_caches()
 
     def remove_state(self, state_to_remove: str):
         """Remove um estado e todas as suas transições associadas."""
@@ -59,14 +121,19 @@ class AutomatoPilha:
 
         self.final_states.discard(state_to_remove)
 
-        new_transitions = defaultdict(set)
-        for (src, inp, pop), destinations in self.transitions.items():
-            if src != state_to_remove:
-                # Filtra os destinos que não são para o estado removido
-                new_destinations = {d for d in destinations if d[0] != state_to_remove}
-                if new_destinations:
-                    new_transitions[(src, inp, pop)] = new_destinations
-        self.transitions = new_transitions
+        # Remove no próprio dicionário: os índices dão as únicas chaves afetadas
+        for key in self._by_src.pop(state_to_remove, ()):
+            self.transitions.pop(key, None)
+        for key in self._by_dst.pop(state_to_remove, ()):
+            destinations = self.transitions.get(key)
+            if destinations is None:
+                continue
+            # Filtra os destinos que não são para o estado removido
+            destinations.difference_update([d for d in destinations if d[0] == state_to_remove])
+            if not destinations:
+                del self.transitions[key]
+                self._by_src.get(key[0], set()).discard(key)
+        self._invalidate_caches()
 
     def rename_state(self, old_name: str, new_name: str):
         """Renomeia um estado em toda a estrutura do autômato."""
@@ -85,15 +152,37 @@ class AutomatoPilha:
             self.final_states.remove(old_name)
             self.final_states.add(new_name)
 
-        new_transitions = defaultdict(set)
-        for (src, inp, pop), destinations in self.transitions.items():
-            new_src = new_name if src == old_name else src
-            new_destinations = set()
-            for dst, push in destinations:
-                new_destinations.add((new_name if dst == old_name else dst, push))
-            # Atualiza a chave e o valor
-            new_transitions[(new_src, inp, pop)] = new_destinations
-        self.transitions = new_transitions
+        # Reescreve no próprio dicionário só as entradas que os índices ligam ao estado
+        incoming = set()
+        for key in self._by_dst.pop(old_name, ()):
+            destinations = self.transitions.get(key)
+            if destinations is None:
+                continue
+            stale = [d for d in destinations if d[0] == old_name]
+            if stale:
+                destinations.difference_update(stale)
+                destinations.update((new_name, push) for _, push in stale)
+                incoming.add(key)
+        outgoing = set()
+        for key in self._by_src.pop(old_name, ()):
+            destinations = self.transitions.pop(key, None)
+            if destinations is None:
+                continue
+            # Atualiza a chave, mantendo o mesmo conjunto de destinos
+            new_key = (new_name, key[1], key[2])
+            self.transitions[new_key] = destinations
+            outgoing.add(new_key)
+            for dst, _ in destinations:
+                if dst == new_name:
+                    incoming.discard(key)
+                    incoming.add(new_key)
+                else:
+                    self._by_dst.setdefault(dst, set()).add(new_key)
+        if outgoing:
+            self._by_src[new_name] = outgoing
+        if incoming:
+            self._by_dst[new_name] = incoming
+        self._invalidate_caches()
         
     def remove_pda_transition(self, src: str, input_sym: str, pop_sym: str, dst: str, push_syms: str):
         """Remove uma transição específica."""
@@ -103,6 +192,8 @@ class AutomatoPilha:
             self.transitions[key].discard(target)
             if not self.transitions[key]: # Remove a chave se o conjunto ficar vazio
                 del self.transitions[key]
+                self._by_src.get(src, set()).discard(key)
+            self._invalidate_caches()
 
 
     # ***** INÍCIO DAS MODIFICAÇÕES (Multi-caractere) *****
@@ -117,34 +208,52 @@ class AutomatoPilha:
         if not self.start_state:
             return [], False
 
+        # O histórico armazena uma configuração representativa de cada passo
+        history: List[Tuple[str, int, Tuple[str, ...]]] = []
+        accepted = self._run(input_str, history)
+        return history, accepted
+
+    def _run(self, input_str: str, history: Optional[List[Tuple[str, int, Tuple[str, ...]]]]) -> bool:
+        """Executa a simulação e retorna se a cadeia foi aceita.
+
+        Com `history` igual a None nenhuma configuração representativa é registrada
+        (caminho usado por simulate).
+        """
         # Configuração: (estado, indice_entrada, pilha_tupla)
         initial_config = (self.start_state, 0, (self.start_stack_symbol,))
     
         # Conjunto de configurações ativas: {(estado, indice_entrada, pilha_tupla)}
         current_configs = self._get_epsilon_closure({initial_config})
         
-        # O histórico armazena uma configuração representativa de cada passo
-        history: List[Tuple[str, int, Tuple[str, ...]]] = []
-        if current_configs:
-            rep_state, rep_idx, rep_stack = next(iter(current_configs))
-            history.append((rep_state, rep_idx, rep_stack))
-        else: # Caso inicial impossível
-            history.append((self.start_state or "-", 0, (self.start_stack_symbol,)))
+        if history is not None:
+            if current_configs:
+                rep_state, rep_idx, rep_stack = next(iter(current_configs))
+                history.append((rep_state, rep_idx, rep_stack))
+            else: # Caso inicial impossível
+                history.append((self.start_state or "-", 0, (self.start_stack_symbol,)))
+
+        # 1. Os símbolos de transição possíveis (não-epsilon) ficam numa trie,
+        # montada uma vez e reaproveitada até a próxima mutação
+        trie = self._input_trie
+        if trie is None:
+            trie = self._input_trie = _symbol_trie(
+                {sym for (_, sym, _) in self.transitions if sym != EPSILON})
+        input_len = len(input_str)
 
         input_idx = 0
-        while input_idx < len(input_str):
-            # 1. Encontra os símbolos de transição possíveis (não-epsilon)
-            possible_symbols = {sym for (src, sym, pop) in self.transitions.keys() if sym != EPSILON}
-            sorted_symbols = sorted(list(possible_symbols), key=len, reverse=True)
-
+        while input_idx < input_len:
+            # 2. Uma caminhada pela fita acha a transição mais longa que corresponde
+            # à entrada restante
             consumed_symbol = None
-            remaining_input = input_str[input_idx:]
-
-            # 2. Encontra a transição mais longa que corresponde à entrada restante
-            for symbol in sorted_symbols:
-                if remaining_input.startswith(symbol):
-                    consumed_symbol = symbol
+            node = trie
+            i = input_idx
+            while i < input_len:
+                node = node.get(input_str[i])
+                if node is None:
                     break
+                i += 1
+                if None in node:
+                    consumed_symbol = node[None]
             
             # 3. Se um símbolo foi consumido, calcula as próximas configurações
             if consumed_symbol:
@@ -160,31 +269,49 @@ class AutomatoPilha:
                 break
 
             # 5. Adiciona uma configuração representativa ao histórico
-            rep_state, _, rep_stack = next(iter(current_configs))
-            history.append((rep_state, input_idx, rep_stack))
+            if history is not None:
+                rep_state, _, rep_stack = next(iter(current_configs))
+                history.append((rep_state, input_idx, rep_stack))
 
         # Verificação final de aceitação
         accepted = False
         if current_configs: # Verifica se não travou
             # A cadeia é aceita se, após consumir toda a entrada, algum dos estados ativos for final
             if input_idx == len(input_str):
-                accepted = any(state in self.final_states for state, _, _ in current_configs)
+                accepted = not self.final_states.isdisjoint(state for state, _, _ in current_configs)
 
-        return history, accepted
+        return accepted
 
     def _get_epsilon_closure(self, configs: Set[Tuple[str, int, Tuple[str, ...]]]) -> Set[Tuple[str, int, Tuple[str, ...]]]:
         """Calcula o fecho-epsilon de um conjunto de configurações (estado, indice, pilha)."""
-        closure = set(configs)
-        queue = list(configs)
+        closure = set()
+        for state, input_idx, stack in configs:
+            closure.update((s, input_idx, st) for s, st in self._config_closure(state, stack))
+        return closure
+
+    def _config_closure(self, state: str, stack: Tuple[str, ...]) -> FrozenSet[Tuple[str, Tuple[str, ...]]]:
+        """Fecho-epsilon de uma única configuração, como pares (estado, pilha).
+
+        O resultado fica em _eps_cache até a próxima mutação.
+        """
+        start = (state, stack)
+        cached = self._eps_cache.get(start)
+        if cached is not None:
+            return cached
+
+        closure = {start}
+        # Fila da busca em largura: `closure` já registra tudo o que foi enfileirado
+        queue = deque(closure)
+        moves = self._move_table().get
+        intern = self._stack_intern.setdefault
 
         while queue:
-            state, input_idx, stack = queue.pop(0)
+            state, stack = queue.popleft()
 
             # Transições ε que não desempilham (lê ε, desempilha ε)
-            key = (state, EPSILON, EPSILON)
-            for next_state, push_syms in self.transitions.get(key, set()):
-                new_stack = stack + tuple(push_syms) if push_syms != EPSILON else stack
-                new_config = (next_state, input_idx, new_stack)
+            for next_state, push in moves((state, EPSILON, EPSILON), ()):
+                new_stack = stack + push if push else stack
+                new_config = (next_state, intern(new_stack, new_stack))
                 if new_config not in closure:
                     closure.add(new_config)
                     queue.append(new_config)
@@ -192,35 +319,46 @@ class AutomatoPilha:
             # Transições ε que desempilham (lê ε, desempilha topo)
             top = stack[-1] if stack else None
             if top:
-                key = (state, EPSILON, top)
-                for next_state, push_syms in self.transitions.get(key, set()):
-                    stack_base = stack[:-1]
-                    new_stack = stack_base + tuple(push_syms) if push_syms != EPSILON else stack_base
-                    new_config = (next_state, input_idx, new_stack)
+                stack_base = stack[:-1]
+                for next_state, push in moves((state, EPSILON, top), ()):
+                    new_stack = stack_base + push
+                    new_config = (next_state, intern(new_stack, new_stack))
                     if new_config not in closure:
                         closure.add(new_config)
                         queue.append(new_config)
-        return closure
+
+        result = self._eps_cache[start] = frozenset(closure)
+        return result
 
     def _move_with_symbol(self, configs: Set[Tuple[str, int, Tuple[str, ...]]], symbol: str) -> Set[Tuple[str, int, Tuple[str, ...]]]:
         """Processa transições para um símbolo de entrada específico (pode ser multi-caractere)."""
-        next_configs = set()
+        moves = self._move_table().get
 
+        # Configurações com o mesmo estado e topo de pilha usam as mesmas transições:
+        # agrupa uma vez e consulta a tabela uma vez por grupo
+        groups: Dict[Tuple[str, Optional[str]], List[Tuple[int, Tuple[str, ...]]]] = defaultdict(list)
         for state, input_idx, stack in configs:
-            # Transições que não desempilham (lê symbol, desempilha ε)
-            key = (state, symbol, EPSILON)
-            for next_state, push_syms in self.transitions.get(key, set()):
-                new_stack = stack + tuple(push_syms) if push_syms != EPSILON else stack
-                next_configs.add((next_state, input_idx, new_stack))
+            groups[(state, stack[-1] if stack else None)].append((input_idx, stack))
 
+        next_configs = set()
+        add = next_configs.add
+        intern = self._stack_intern.setdefault
+        for (state, top), members in groups.items():
+            # Transições que não desempilham (lê symbol, desempilha ε)
+            no_pop = moves((state, symbol, EPSILON), ())
             # Transições que desempilham (lê symbol, desempilha topo)
-            top = stack[-1] if stack else None
-            if top:
-                key = (state, symbol, top)
-                for next_state, push_syms in self.transitions.get(key, set()):
+            pop = moves((state, symbol, top), ()) if top else ()
+            if not no_pop and not pop:
+                continue
+            for input_idx, stack in members:
+                for next_state, push in no_pop:
+                    new_stack = stack + push if push else stack
+                    add((next_state, input_idx, intern(new_stack, new_stack)))
+                if pop:
                     stack_base = stack[:-1]
-                    new_stack = stack_base + tuple(push_syms) if push_syms != EPSILON else stack_base
-                    next_configs.add((next_state, input_idx, new_stack))
+                    for next_state, push in pop:
+                        new_stack = stack_base + push
+                        add((next_state, input_idx, intern(new_stack, new_stack)))
         return next_configs
     # ***** FIM DAS MODIFICAÇÕES *****
 
@@ -233,12 +371,11 @@ class AutomatoPilha:
         if not self.start_state:
             return False
 
-        # A nova simulate_history lida com a lógica de aceitação
-        _, accepted = self.simulate_history(input_str)
-        return accepted
+        # Mesma lógica de aceitação de simulate_history, sem montar o histórico
+        return self._run(input_str, None)
 
-    def to_json(self) -> str:
-        """Serializa o autômato para uma string JSON."""
+    def to_dict(self) -> dict:
+        """Retorna o autômato como dicionário serializável (a mesma estrutura do JSON)."""
         serializable_transitions = {}
         for (src, inp, pop_sym), dests in self.transitions.items():
             key = f"{src},{inp},{pop_sym}"
@@ -246,11 +383,11 @@ class AutomatoPilha:
             serializable_transitions[key] = [list(d) for d in dests]
 
         # Filtra alfabetos para garantir que sejam listas de strings
-        input_alpha = list(filter(lambda x: isinstance(x, str), self.input_alphabet))
-        stack_alpha = list(filter(lambda x: isinstance(x, str), self.stack_alphabet))
+        input_alpha = [x for x in self.input_alphabet if isinstance(x, str)]
+        stack_alpha = [x for x in self.stack_alphabet if isinstance(x, str)]
 
 
-        data = {
+        return {
             "states": list(self.states),
             "input_alphabet": input_alpha,
             "stack_alphabet": stack_alpha,
@@ -259,12 +396,27 @@ class AutomatoPilha:
             "final_states": list(self.final_states),
             "transitions": serializable_transitions,
         }
-        return json.dumps(data, indent=2, ensure_ascii=False)
+
+    def to_json(self) -> str:
+        """Serializa o autômato para uma string JSON."""
+        # Sem mutações desde a última chamada, devolve o texto já serializado
+        key = (self.start_state, self.start_stack_symbol, frozenset(self.states),
+               frozenset(self.final_states), frozenset(self.input_alphabet),
+               frozenset(self.stack_alphabet))
+        if self._json_cache is not None and self._json_cache[0] == key:
+            return self._json_cache[1]
+        text = json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+        self._json_cache = (key, text)
+        return text
 
     @classmethod
     def from_json(cls, json_str: str) -> 'AutomatoPilha':
         """Cria um Autômato de Pilha a partir de uma string JSON."""
-        data = json.loads(json_str)
+        return cls.from_dict(json.loads(json_str))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'AutomatoPilha':
+        """Cria um Autômato de Pilha a partir do dicionário gerado por to_dict."""
         pda = cls()
         pda.states = set(data.get("states", []))
         pda.input_alphabet = set(data.get("input_alphabet", []))
@@ -282,12 +434,21 @@ class AutomatoPilha:
                 parts = key.split(',', 2)
                 if len(parts) == 3:
                     src, inp, pop_sym = parts
-                    # Converte listas de volta para tuplas ao carregar
-                    pda.transitions[(src, inp, pop_sym)] = {tuple(d) for d in dests}
+                    # Converte listas de volta para tuplas ao carregar. Destinos que não são
+                    # pares (destino, empilha) são descartados aqui, antes de irem para a
+                    # tabela, para não quebrarem os índices nem a simulação
+                    valid = set()
+                    for d in dests:
+                        d = tuple(d)
+                        if len(d) != 2:
+                            print(f"Aviso: Ignorando destino malformado da transição {key}: {list(d)}")
+                            continue
+                        valid.add(d)
+                    pda.transitions[(src, inp, pop_sym)] = valid
                      # Adiciona símbolos aos alfabetos (redundante se add_transition for chamado, mas seguro)
                     if inp != EPSILON: pda.input_alphabet.add(inp)
                     if pop_sym != EPSILON: pda.stack_alphabet.add(pop_sym)
-                    for _, push_list in dests:
+                    for _, push_list in valid:
                         for char in push_list:
                              if char != EPSILON: pda.stack_alphabet.add(char)
 
@@ -296,6 +457,8 @@ class AutomatoPilha:
             except Exception as e:
                  print(f"Aviso: Erro ao processar transição {key} -> {dests}: {e}")
 
+        pda._rebuild_index()
+
         # Garante que start_state é válido
         if pda.start_state not in pda.states:
             if pda.states:
@@ -310,20 +473,22 @@ class AutomatoPilha:
 def snapshot_of_pda(automato: AutomatoPilha, positions: Dict[str, Tuple[int, int]]) -> str:
     """Retorna JSON serializável representando o estado completo (autômato + posições)."""
     data = {
-        "automato": json.loads(automato.to_json()),
+        "automato": automato.to_dict(),
         "positions": positions
     }
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
     return json.dumps(data, ensure_ascii=False)
 
 def restore_from_pda_snapshot(s: str) -> Tuple[AutomatoPilha, Dict[str, Tuple[int, int]]]:
     """Restaura um autômato de pilha e suas posições a partir de um snapshot JSON."""
-    data = json.loads(s)
+    data = orjson.loads(s) if orjson is not None else json.loads(s)
     
     # Garante que o objeto do autômato seja um dicionário antes de passar para from_json
     automato_data = data.get("automato", {})
     if isinstance(automato_data, str):
         automato_data = json.loads(automato_data)
 
-    automato = AutomatoPilha.from_json(json.dumps(automato_data))
+    automato = AutomatoPilha.from_dict(automato_data)
     positions = data.get("positions", {})
     return automato, positions
\ No newline at end of file
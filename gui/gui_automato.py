@@ -7,9 +7,11 @@ import math
 import os
 import io
 import tkinter as tk
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from tkinter import simpledialog, filedialog, messagebox, ttk
 from PIL import Image, ImageTk, ImageEnhance
-from typing import Dict, Tuple, Set, List, DefaultDict, Optional
+from typing import Deque, Dict, Tuple, Set, FrozenSet, List, Optional
 
 from core.automato import Automato, EPSILON
 
@@ -17,6 +19,8 @@ STATE_RADIUS = 24
 FONT = ("Helvetica", 13)
 TOKEN_RADIUS = 8
 ANIM_MS = 300
+UNDO_LIMIT = 50 # Snapshots guardados em cada pilha de undo/redo
+GRID_CELL = 2 * STATE_RADIUS # Lado da célula da grade usada nos testes de clique
 
 # Cores
 ACTIVE_MODE_COLOR = "#dbeafe"
@@ -31,23 +35,73 @@ TAPE_BORDER_COLOR = "#9ca3af" # Borda da fita
 TAPE_STATE_ACTIVE_COLOR = "#a7f3d0" # Verde claro
 
 
+# cairosvg é opcional e pesado de importar: carregado só na primeira exportação PNG.
+# None = ainda não verificado, False = indisponível
+_cairosvg = None
+
+def _load_cairosvg():
+    """Retorna o módulo cairosvg (ou None se não estiver instalado), importando uma única vez."""
+    global _cairosvg
+    if _cairosvg is None:
+        try:
+            import cairosvg
+            _cairosvg = cairosvg
+        except ImportError:
+            _cairosvg = False
+    return _cairosvg or None
+
+
+# -------------------------
+# Grade espacial para testes de clique
+# -------------------------
+def _grid_key(x: float, y: float) -> Tuple[int, int]:
+    return int(x // GRID_CELL), int(y // GRID_CELL)
+
+def _grid_add(grid: Dict[Tuple[int, int], List], key, x: float, y: float):
+    grid.setdefault(_grid_key(x, y), []).append(key)
+
+def _grid_discard(grid: Dict[Tuple[int, int], List], key, x: float, y: float):
+    cell = grid.get(_grid_key(x, y))
+    if cell and key in cell:
+        cell.remove(key)
+        if not cell: del grid[_grid_key(x, y)]
+
+def _grid_near(grid: Dict[Tuple[int, int], List], x: float, y: float):
+    """Itens nas 3x3 células em volta de (x, y); cobre qualquer raio <= GRID_CELL."""
+    gx, gy = _grid_key(x, y)
+    for i in (gx - 1, gx, gx + 1):
+        for j in (gy - 1, gy, gy + 1):
+            yield from grid.get((i, j), ())
+
+
 # -------------------------
 # Utilitários para snapshot (undo/redo)
 # -------------------------
 def snapshot_of(automato: Automato, positions: Dict[str, Tuple[int, int]]):
     """Retorna JSON serializável representando o estado completo (automato + posições)."""
     data = {
-        "automato": json.loads(automato.to_json()),
+        "automato": automato.to_dict(),
         "positions": positions
     }
     return json.dumps(data, ensure_ascii=False)
 
 def restore_from_snapshot(s: str):
     data = json.loads(s)
-    a = Automato.from_json(json.dumps(data.get("automato", {})))
+    a = Automato.from_dict(data.get("automato") or {})
     pos = data.get("positions", {})
     return a, pos
 
+def memory_snapshot_of(automato: Automato, positions: Dict[str, Tuple[int, int]]) -> Tuple[dict, Dict[str, Tuple[int, int]]]:
+    """Snapshot em memória para undo/redo, sem codificar/decodificar JSON.
+
+    O dicionário do autômato vem de to_dict (compartilhado enquanto não houver mutação)
+    e nunca é alterado depois de guardado.
+    """
+    return automato.to_dict(), dict(positions)
+
+def restore_from_memory_snapshot(snap: Tuple[dict, Dict[str, Tuple[int, int]]]):
+    return Automato.from_dict(snap[0]), dict(snap[1])
+
 # -------------------------
 # Classe para Tooltips
 # -------------------------
@@ -99,6 +153,26 @@ class EditorGUI:
         self.positions: Dict[str, Tuple[int, int]] = {}
         self.state_widgets: Dict[str, Dict] = {}
         self.edge_widgets: Dict[Tuple[str, str], Dict] = {}
+        # Itens persistentes do canvas, atualizados por _refresh_transform/_refresh_highlight
+        self._start_arrow: Optional[int] = None
+        self._drawn_active: FrozenSet[str] = frozenset()
+        self._drawn_active_edges: Set[Tuple[str, str]] = set()
+        # Opções Tcl pré-montadas (indexadas por "ativo?") para criar itens sem o wrapper do Canvas
+        self._line_opts = {a: ("-smooth", "1", "-arrow", "last", "-width", w, "-fill", c)
+                           for a, (c, w) in ((a, self._edge_style(a)) for a in (False, True))}
+        self._label_opts = {a: ("-font", FONT, "-fill", self._edge_style(a)[0]) for a in (False, True)}
+        # Círculos dos estados levam a tag "state" e, se ativos na simulação, "active"
+        self._oval_opts = {a: ("-fill", f, "-outline", o, "-width", w, "-tags", ("state", "active") if a else "state")
+                           for a, (f, o, w) in ((a, self._state_style(a)) for a in (False, True))}
+        self._final_opts = ("-outline", "black", "-width", 2)
+        # Redesenho coalescido (um por ciclo ocioso do Tk) durante arrastar/zoom/pan
+        self._redraw_pending = False
+        self._redraw_moved: Optional[str] = None
+        # Grades espaciais (coordenadas lógicas) de estados e rótulos de arestas
+        self._pos_grid: Dict[Tuple[int, int], List[str]] = {}
+        self._edge_grid: Dict[Tuple[int, int], List[Tuple[str, str]]] = {}
+        # (src, dst) -> (chave de validade, coords da seta, posição do rótulo)
+        self._edge_geom_cache: Dict[Tuple[str, str], Tuple] = {}
         self.selected_state = None
         self.dragging = None
         self.mode = "select"
@@ -109,13 +183,14 @@ class EditorGUI:
         self.icons: Dict[str, ImageTk.PhotoImage] = {}
 
         # Undo/Redo
-        self.undo_stack: List[str] = []
-        self.redo_stack: List[str] = []
+        # Buffers circulares: ao passar do limite o snapshot mais antigo sai em O(1)
+        self.undo_stack: Deque[Tuple[dict, Dict[str, Tuple[int, int]]]] = deque(maxlen=UNDO_LIMIT)
+        self.redo_stack: Deque[Tuple[dict, Dict[str, Tuple[int, int]]]] = deque(maxlen=UNDO_LIMIT)
 
         # Simulação
         # ***** MODIFICADO *****
         # O histórico agora é uma lista de tuplas: (set_de_estados, indice_de_entrada)
-        self.history: List[Tuple[Set[str], int]] = []
+        self.history: List[Tuple[FrozenSet[str], int]] = []
         # **********************
         self.sim_step = 0
         self.sim_playing = False
@@ -129,6 +204,9 @@ class EditorGUI:
         self.pan_last = None
         self.current_filepath = None
 
+        # Exportações pesadas (PNG) rodam fora da thread do Tk
+        self._io_pool = ThreadPoolExecutor(max_workers=1)
+
         # Construção da UI
         self._build_toolbar()
         self._build_canvas()
@@ -375,7 +453,8 @@ class EditorGUI:
             self.automato, self.positions = restore_from_snapshot(snapshot)
             self.current_filepath = path
             self.root.title(f"IC-Tômato++ — {self.current_filepath}")
-            self.undo_stack = [snapshot] # Reseta o histórico de undo/redo
+            self.undo_stack.clear() # Reseta o histórico de undo/redo
+            self.undo_stack.append(memory_snapshot_of(self.automato, self.positions))
             self.redo_stack.clear()
             # Ajusta a visualização para centralizar os estados carregados
             try:
@@ -530,17 +609,34 @@ class EditorGUI:
             messagebox.showinfo("Exportar", f"SVG exportado para {path}", parent=self.root)
 
     def cmd_export_png(self):
+        # Sem cairosvg avisa logo, antes de abrir o diálogo de arquivo
+        try:
+            cairosvg = _load_cairosvg()
+        except OSError as e: # p.ex. biblioteca nativa do cairo ausente
+            messagebox.showerror("Exportar PNG", f"Ocorreu um erro: {e}", parent=self.root)
+            return
+        if cairosvg is None:
+            messagebox.showwarning("Exportar PNG", "A biblioteca 'cairosvg' não está instalada.\nPara exportar para PNG, instale com: pip install cairosvg", parent=self.root)
+            return
         path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG files", "*.png")])
         if not path: return
         svg_text = self._generate_svg_text()
-        try:
-            import cairosvg
-            cairosvg.svg2png(bytestring=svg_text.encode('utf-8'), write_to=path)
-            messagebox.showinfo("Exportar PNG", f"PNG salvo em {path}", parent=self.root)
-        except ImportError:
-            messagebox.showwarning("Exportar PNG", "A biblioteca 'cairosvg' não está instalada.\nPara exportar para PNG, instale com: pip install cairosvg", parent=self.root)
-        except Exception as e:
+        # A rasterização pode demorar em diagramas grandes: roda em segundo plano e a
+        # thread do Tk só consulta o resultado (Tkinter não deve ser chamado de outra thread)
+        fut = self._io_pool.submit(cairosvg.svg2png, bytestring=svg_text.encode('utf-8'), write_to=path)
+        self.status.config(text="Exportando PNG...")
+        self.root.after(50, self._png_done, fut, path)
+
+    def _png_done(self, fut: Future, path: str):
+        if not fut.done():
+            self.root.after(50, self._png_done, fut, path)
+            return
+        e = fut.exception()
+        if e is not None:
             messagebox.showerror("Exportar PNG", f"Ocorreu um erro: {e}", parent=self.root)
+        else:
+            self.status.config(text=f"PNG salvo em {path}")
+            messagebox.showinfo("Exportar PNG", f"PNG salvo em {path}", parent=self.root)
 
     def _to_canvas(self, x, y):
         return (x - self.offset_x) / self.scale, (y - self.offset_y) / self.scale
@@ -553,7 +649,7 @@ class EditorGUI:
         if self.mode == "add_state":
             sid = f"q{len(self.automato.states)}"
             self.automato.add_state(sid)
-            self.positions[sid] = (cx, cy)
+            self._set_position(sid, cx, cy)
             self._push_undo_snapshot()
             self.status.config(text=f"Estado {sid} adicionado")
             self.draw_all()
@@ -645,9 +741,9 @@ class EditorGUI:
             cx, cy = self._to_canvas(event.x, event.y)
             dx, dy = cx - ox, cy - oy
             x0, y0 = self.positions.get(sid, (0, 0))
-            self.positions[sid] = (x0 + dx, y0 + dy)
+            self._set_position(sid, x0 + dx, y0 + dy)
             self.dragging = (sid, cx, cy)
-            self.draw_all()
+            self._schedule_redraw(sid)
 
     def on_canvas_release(self, event):
         if self.dragging: self._push_undo_snapshot()
@@ -660,7 +756,7 @@ class EditorGUI:
         mx, my = event.x, event.y
         cx_before, cy_before = (mx - self.offset_x) / old_scale, (my - self.offset_y) / old_scale
         self.offset_x, self.offset_y = mx - cx_before * self.scale, my - cy_before * self.scale
-        self.draw_all()
+        self._schedule_redraw()
 
     def on_middle_press(self, event): self.pan_last = (event.x, event.y)
     def on_middle_release(self, event): self.pan_last = None
@@ -669,7 +765,7 @@ class EditorGUI:
             dx, dy = event.x - self.pan_last[0], event.y - self.pan_last[1]
             self.offset_x += dx; self.offset_y += dy
             self.pan_last = (event.x, event.y)
-            self.draw_all()
+            self._schedule_redraw()
 
     def on_right_click(self, event):
         cx, cy = self._to_canvas(event.x, event.y)
@@ -808,17 +904,38 @@ class EditorGUI:
                 if sym: self.automato.remove_transition(src, sym.replace("ε", EPSILON), dst)
             self.draw_all()
 
+    def _set_position(self, sid, x, y):
+        """Atualiza a posição lógica de um estado mantendo a grade espacial em dia."""
+        old = self.positions.get(sid)
+        if old is not None: _grid_discard(self._pos_grid, sid, *old)
+        self.positions[sid] = (x, y)
+        _grid_add(self._pos_grid, sid, x, y)
+
+    def _rebuild_pos_grid(self):
+        grid: Dict[Tuple[int, int], List[str]] = {}
+        for sid, (x, y) in self.positions.items(): _grid_add(grid, sid, x, y)
+        self._pos_grid = grid
+
     def _find_state_at(self, cx, cy):
-        for sid, (sx, sy) in self.positions.items():
-            if math.hypot(sx - cx, sy - cy) <= STATE_RADIUS: return sid
-        return None
+        # Só olha os estados das células vizinhas; em caso de sobreposição, o mais próximo vence
+        best, best_d = None, STATE_RADIUS
+        for sid in _grid_near(self._pos_grid, cx, cy):
+            pos = self.positions.get(sid)
+            if pos is None: continue
+            d = math.hypot(pos[0] - cx, pos[1] - cy)
+            if d <= best_d: best, best_d = sid, d
+        return best
 
     def _find_edge_at(self, cx, cy):
-        for (src, dst), info in self.edge_widgets.items():
-            tx, ty = info.get("text_pos", (None, None))
-            # Aumenta a área de clique para o texto
-            if tx and math.hypot(tx-cx, ty-cy) <= 20: return src, dst
-        return None
+        # Aumenta a área de clique para o texto
+        best, best_d = None, 20
+        for key in _grid_near(self._edge_grid, cx, cy):
+            info = self.edge_widgets.get(key)
+            if info is None: continue
+            tx, ty = info["text_pos"]
+            d = math.hypot(tx - cx, ty - cy)
+            if d <= best_d: best, best_d = key, d
+        return best
 
     #################################################################
     # NOVA FUNÇÃO PARA DESENHAR A FITA DE ENTRADA                   #
@@ -854,8 +971,8 @@ class EditorGUI:
             is_head = (self.sim_step > 0 and i >= consumed_idx_prev and i < consumed_idx_now)
             fill_color = TAPE_HEAD_COLOR if is_head else TAPE_CELL_COLOR
 
-            self.canvas.create_rectangle(x1, y1, x2, y2, fill=fill_color, outline=TAPE_BORDER_COLOR)
-            self.canvas.create_text((x1 + x2) / 2, (y1 + y2) / 2, text=symbol, font=("Courier", 14, "bold"))
+            self.canvas.create_rectangle(x1, y1, x2, y2, fill=fill_color, outline=TAPE_BORDER_COLOR, tags="overlay")
+            self.canvas.create_text((x1 + x2) / 2, (y1 + y2) / 2, text=symbol, font=("Courier", 14, "bold"), tags="overlay")
 
             # Desenha a "cabeça de leitura" (triângulo) acima da PRÓXIMA célula a ser lida
             if i == consumed_idx_now:
@@ -865,111 +982,251 @@ class EditorGUI:
                     head_x - 6, y1 - 10,
                     head_x + 6, y1 - 10,
                     fill=DEFAULT_TRANSITION_COLOR,
-                    outline=DEFAULT_TRANSITION_COLOR
+                    outline=DEFAULT_TRANSITION_COLOR,
+                    tags="overlay"
                 )
     # ***** FIM DA MODIFICAÇÃO *****
 
-    def draw_all(self):
-        self.canvas.delete("all")
-        self.state_widgets.clear(); self.edge_widgets.clear()
-
-        # --- LÓGICA ADICIONADA PARA SIMULAÇÃO ---
-        # ***** INÍCIO DA MODIFICAÇÃO *****
+    def _sim_context(self):
+        """Retorna (ativos_atuais, ativos_anteriores, símbolo_consumido) do passo atual."""
         # Pega o conjunto de estados do passo anterior e o atual
-        current_active_set = self.history[self.sim_step][0] if self.history else set()
-        prev_active_set = self.history[self.sim_step - 1][0] if self.history and self.sim_step > 0 else set()
+        current_active_set = self.history[self.sim_step][0] if self.history else frozenset()
+        prev_active_set = self.history[self.sim_step - 1][0] if self.history and self.sim_step > 0 else frozenset()
 
         # Pega os índices de consumo
         consumed_now = self.history[self.sim_step][1] if self.history else 0
         consumed_prev = self.history[self.sim_step - 1][1] if self.sim_step > 0 else 0
-        
+
         # O símbolo é a substring entre o índice anterior e o atual
         current_symbol = self.sim_input_str[consumed_prev:consumed_now] if self.sim_input_str and self.sim_step > 0 else None
-        # ***** FIM DA MODIFICAÇÃO *****
-        # --- FIM DA LÓGICA ADICIONADA ---
+        return current_active_set, prev_active_set, current_symbol
+
+    def _active_edges(self, edges):
+        """Conjunto de arestas (src, dst) ativadas no passo atual da simulação."""
+        current_active_set, prev_active_set, current_symbol = self._sim_context()
+        active = set()
+        if not current_symbol:
+            return active
+        closure_of_prev = None
+        for (src, dst), syms in edges.items():
+            # Verifica se a transição foi ativada no passo atual
+            if src not in prev_active_set or dst not in current_active_set: continue
+            # Checa se o símbolo da transição atual está nos rótulos desta seta
+            if current_symbol in syms:
+                active.add((src, dst))
+            # (Esta lógica de fecho-epsilon pode não ser 100% precisa para destaque,
+            # mas é uma boa aproximação)
+            elif EPSILON in syms:
+                if closure_of_prev is None:
+                    closure_of_prev = self.automato.epsilon_closure(prev_active_set)
+                if src in closure_of_prev and dst in closure_of_prev:
+                    active.add((src, dst))
+        return active
+
+    def _edge_geometry(self, src, dst, curved):
+        """Coordenadas (de tela) da seta src->dst e posição do seu rótulo.
+
+        O resultado fica em cache enquanto as posições dos extremos e a transformação não mudarem.
+        """
+        key = (self.positions[src], self.positions[dst], self.scale, self.offset_x, self.offset_y, curved)
+        cached = self._edge_geom_cache.get((src, dst))
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+        coords, text_pos = self._compute_edge_geometry(src, dst, curved)
+        self._edge_geom_cache[(src, dst)] = (key, coords, text_pos)
+        return coords, text_pos
+
+    def _compute_edge_geometry(self, src, dst, curved):
+        # Transformação feita inline e raio escalado calculado uma vez por aresta
+        scale, ox, oy = self.scale, self.offset_x, self.offset_y
+        r = STATE_RADIUS * scale
+        px, py = self.positions[src]
+        x1, y1 = px * scale + ox, py * scale + oy
+        if src == dst:
+            coords = (x1 - r * 0.7, y1 - r * 0.7,
+                      x1 - r * 1.5, y1 - r * 2.5,
+                      x1 + r * 1.5, y1 - r * 2.5,
+                      x1 + r * 0.7, y1 - r * 0.7)
+            return coords, (x1, y1 - r * 2.3)
+        px, py = self.positions[dst]
+        x2, y2 = px * scale + ox, py * scale + oy
+        dx, dy = x2 - x1, y2 - y1; dist = math.hypot(dx, dy) or 1
+        ux, uy = dx/dist, dy/dist
+        offset = 15*scale if curved else 0
+        rx, ry = ux*r, uy*r
+        start_x, start_y = x1+rx, y1+ry
+        end_x, end_y = x2-rx, y2-ry
+        mid_x, mid_y = (start_x+end_x)/2, (start_y+end_y)/2
+        ctrl_x, ctrl_y = mid_x - uy*offset, mid_y + ux*offset
+        return (start_x, start_y, ctrl_x, ctrl_y, end_x, end_y), (mid_x-uy*(offset+15), mid_y+ux*(offset+15))
+
+    def _state_style(self, is_active):
+        return ("#e0f2fe", "#0284c7", 3) if is_active else ("white", "black", 2)
+
+    def _edge_style(self, is_active):
+        return (ACTIVE_TRANSITION_COLOR, 3) if is_active else (DEFAULT_TRANSITION_COLOR, 1.5)
+
+    def _create_item(self, kind, coords, opts):
+        """Cria um item do canvas chamando o Tcl diretamente com opções já montadas."""
+        canvas = self.canvas
+        return canvas.tk.getint(canvas.tk.call(canvas._w, "create", kind, *coords, *opts))
+
+    def draw_all(self):
+        """Reconstrói a cena inteira. Use quando a topologia do autômato mudar;
+        movimentos de câmera/estados usam _refresh_transform e passos de
+        simulação usam _refresh_highlight, que apenas atualizam os itens existentes."""
+        self.canvas.delete("all")
+        self.state_widgets.clear(); self.edge_widgets.clear()
+        self._rebuild_pos_grid(); self._edge_grid = {}
+
+        current_active_set = self._sim_context()[0]
 
         # Agrega transições para desenhar setas múltiplas ou com múltiplos rótulos
-        agg: DefaultDict[Tuple[str, str], Set[str]] = DefaultDict(set)
-        for (src, sym), dsts in self.automato.transitions.items():
-            for dst in dsts: agg[(src, dst)].add(sym)
+        # (o autômato guarda o agrupamento até a próxima mudança nas transições)
+        agg = self.automato.edge_symbols()
 
+        active_edges = self._active_edges(agg)
+        create, line_opts, label_opts = self._create_item, self._line_opts, self._label_opts
         for (src, dst), syms in agg.items():
             if src not in self.positions or dst not in self.positions: continue
-            x1, y1 = self._from_canvas(*self.positions[src])
-            x2, y2 = self._from_canvas(*self.positions[dst])
             label = ",".join(sorted(list(syms))).replace(EPSILON, "ε")
-
-            # --- LÓGICA DE DESTAQUE DA TRANSIÇÃO ---
-            is_active_transition = False
-            # Verifica se a transição foi ativada no passo atual
-            if current_symbol and src in prev_active_set and dst in current_active_set:
-                 # Checa se o símbolo da transição atual está nos rótulos desta seta
-                 if current_symbol in syms:
-                     is_active_transition = True
-                 # (Esta lógica de fecho-epsilon pode não ser 100% precisa para destaque,
-                 # mas é uma boa aproximação)
-                 if EPSILON in syms:
-                     closure_of_prev = self.automato.epsilon_closure(prev_active_set)
-                     if src in closure_of_prev and dst in closure_of_prev:
-                         is_active_transition = True
-
-            color = ACTIVE_TRANSITION_COLOR if is_active_transition else DEFAULT_TRANSITION_COLOR
-            width = 3 if is_active_transition else 1.5
-            # --- FIM DA LÓGICA DE DESTAQUE ---
-
-
-            if src == dst:
-                r = STATE_RADIUS * self.scale
-                p1 = (x1 - r * 0.7, y1 - r * 0.7)
-                c1 = (x1 - r * 1.5, y1 - r * 2.5)
-                c2 = (x1 + r * 1.5, y1 - r * 2.5)
-                p2 = (x1 + r * 0.7, y1 - r * 0.7)
-                self.canvas.create_line(p1, c1, c2, p2, smooth=True, arrow=tk.LAST, width=width, fill=color)
-                tx, ty = x1, y1 - r * 2.3
-                text_id = self.canvas.create_text(tx, ty, text=label, font=FONT, fill=color)
-                self.canvas.tag_bind(text_id, "<Double-Button-1>", lambda e, s=src, d=dst: self._edit_edge_label(s, d))
-
-                self.edge_widgets[(src, dst)] = {"label": label, "text_pos": self._to_canvas(tx, ty)}
-            else:
-                dx, dy = x2 - x1, y2 - y1; dist = math.hypot(dx, dy) or 1
-                ux, uy = dx/dist, dy/dist
-                offset = 15*self.scale if (dst,src) in agg else 0
-                start_x, start_y = x1+ux*STATE_RADIUS*self.scale, y1+uy*STATE_RADIUS*self.scale
-                end_x, end_y = x2-ux*STATE_RADIUS*self.scale, y2-uy*STATE_RADIUS*self.scale
-                mid_x, mid_y = (start_x+end_x)/2, (start_y+end_y)/2
-                ctrl_x, ctrl_y = mid_x - uy*offset, mid_y + ux*offset
-                self.canvas.create_line(start_x, start_y, ctrl_x, ctrl_y, end_x, end_y, smooth=True, width=width, arrow=tk.LAST, fill=color)
-                txt_x, txt_y = mid_x-uy*(offset+15), mid_y+ux*(offset+15)
-                text_id = self.canvas.create_text(txt_x, txt_y, text=label, font=FONT, fill=color)
-                self.canvas.tag_bind(text_id, "<Double-Button-1>", lambda e, s=src, d=dst: self._edit_edge_label(s, d))
-
-                self.edge_widgets[(src, dst)] = {"label": label, "text_pos": self._to_canvas(txt_x, txt_y)}
-
-        for sid in sorted(list(self.automato.states)):
-            x_logic, y_logic = self.positions.get(sid, (100, 100))
-            x, y = self._from_canvas(x_logic, y_logic)
-            is_active = sid in current_active_set
-            fill, outline, width = ("#e0f2fe", "#0284c7", 3) if is_active else ("white", "black", 2)
-            self.canvas.create_oval(x-STATE_RADIUS*self.scale, y-STATE_RADIUS*self.scale, x+STATE_RADIUS*self.scale, y+STATE_RADIUS*self.scale, fill=fill, outline=outline, width=width)
-            self.canvas.create_text(x, y, text=sid, font=FONT)
-            if sid in self.automato.final_states:
-                self.canvas.create_oval(x-(STATE_RADIUS-5)*self.scale, y-(STATE_RADIUS-5)*self.scale, x+(STATE_RADIUS-5)*self.scale, y+(STATE_RADIUS-5)*self.scale, outline="black", width=2)
-
+            is_active = (src, dst) in active_edges
+            curved = src != dst and (dst, src) in agg
+            coords, (tx, ty) = self._edge_geometry(src, dst, curved)
+            line_id = create("line", coords, line_opts[is_active])
+            text_id = create("text", (tx, ty), label_opts[is_active] + ("-text", label))
+            self.canvas.tag_bind(text_id, "<Double-Button-1>", lambda e, s=src, d=dst: self._edit_edge_label(s, d))
+
+            text_pos = self._to_canvas(tx, ty)
+            self.edge_widgets[(src, dst)] = {"label": label, "syms": syms, "curved": curved, "line": line_id, "text": text_id, "text_pos": text_pos}
+            _grid_add(self._edge_grid, (src, dst), *text_pos)
+        if len(self._edge_geom_cache) > len(self.edge_widgets):
+            # Descarta geometria de arestas que não existem mais
+            self._edge_geom_cache = {k: v for k, v in self._edge_geom_cache.items() if k in self.edge_widgets}
+        # Arestas sem posição para algum extremo não foram desenhadas: ficam fora do conjunto
+        self._drawn_active_edges = active_edges & self.edge_widgets.keys()
+
+        r, r_in = STATE_RADIUS*self.scale, (STATE_RADIUS-5)*self.scale
+        oval_opts, final_opts, final_states = self._oval_opts, self._final_opts, self.automato.final_states
+        for sid in self.automato.sorted_states():
+            x, y = self._from_canvas(*self.positions.get(sid, (100, 100)))
+            widgets = {
+                "oval": create("oval", (x-r, y-r, x+r, y+r), oval_opts[sid in current_active_set]),
+                "text": create("text", (x, y), ("-font", FONT, "-text", sid)),
+                "final": None,
+            }
+            if sid in final_states:
+                widgets["final"] = create("oval", (x-r_in, y-r_in, x+r_in, y+r_in), final_opts)
+            self.state_widgets[sid] = widgets
+        self._drawn_active = current_active_set
+
+        self._start_arrow = None
         if self.automato.start_state and self.automato.start_state in self.positions:
             sx, sy = self._from_canvas(*self.positions[self.automato.start_state])
-            self.canvas.create_line(sx-STATE_RADIUS*2*self.scale, sy, sx-STATE_RADIUS*self.scale, sy, arrow=tk.LAST, width=2)
+            self._start_arrow = self.canvas.create_line(sx-STATE_RADIUS*2*self.scale, sy, sx-r, sy, arrow=tk.LAST, width=2)
 
+        self._draw_overlay()
+
+    def _draw_overlay(self):
+        """Desenha os elementos fixos na tela (resultado e fita), marcados com a tag 'overlay'."""
+        self.canvas.delete("overlay")
         if self.result_indicator:
             color = "#16a34a" if self.result_indicator == "ACEITA" else "#dc2626"
-            self.canvas.create_text(self.canvas.winfo_width()-60, 30, text=self.result_indicator, font=("Helvetica", 16, "bold"), fill=color)
+            self.canvas.create_text(self.canvas.winfo_width()-60, 30, text=self.result_indicator, font=("Helvetica", 16, "bold"), fill=color, tags="overlay")
 
         # --- CHAMA A FUNÇÃO DA FITA NO FINAL DO DESENHO ---
         self._draw_input_tape()
 
+    def _refresh_transform(self, moved=None):
+        """Reposiciona os itens já existentes após arrastar, dar zoom ou pan.
+
+        Se `moved` for dado, apenas esse estado e as arestas incidentes nele são atualizados.
+        """
+        r, r_in = STATE_RADIUS*self.scale, (STATE_RADIUS-5)*self.scale
+        sids = (moved,) if moved is not None else self.state_widgets.keys()
+        for sid in sids:
+            widgets = self.state_widgets.get(sid)
+            if widgets is None: continue
+            x, y = self._from_canvas(*self.positions.get(sid, (100, 100)))
+            self.canvas.coords(widgets["oval"], x-r, y-r, x+r, y+r)
+            self.canvas.coords(widgets["text"], x, y)
+            if widgets["final"] is not None:
+                self.canvas.coords(widgets["final"], x-r_in, y-r_in, x+r_in, y+r_in)
+
+        edge_grid = self._edge_grid if moved is not None else {}
+        for (src, dst), info in self.edge_widgets.items():
+            if moved is not None and moved != src and moved != dst:
+                continue
+            coords, (tx, ty) = self._edge_geometry(src, dst, info["curved"])
+            self.canvas.coords(info["line"], *coords)
+            self.canvas.coords(info["text"], tx, ty)
+            if moved is not None: _grid_discard(edge_grid, (src, dst), *info["text_pos"])
+            info["text_pos"] = self._to_canvas(tx, ty)
+            _grid_add(edge_grid, (src, dst), *info["text_pos"])
+        self._edge_grid = edge_grid
+
+        start = self.automato.start_state
+        if self._start_arrow is not None and (moved is None or moved == start):
+            sx, sy = self._from_canvas(*self.positions[start])
+            self.canvas.coords(self._start_arrow, sx-STATE_RADIUS*2*self.scale, sy, sx-r, sy)
+
+    def _schedule_redraw(self, moved=None):
+        """Agenda um único _refresh_transform para o próximo ciclo ocioso do Tk.
+
+        Eventos de movimento chegam muito mais rápido do que a tela precisa ser
+        atualizada; aqui eles só alteram posições/offsets e o desenho acontece uma vez.
+        """
+        if self._redraw_pending:
+            # Se eventos diferentes se acumularam, atualiza tudo
+            if self._redraw_moved != moved: self._redraw_moved = None
+            return
+        self._redraw_pending, self._redraw_moved = True, moved
+        self.root.after_idle(self._do_redraw)
+
+    def _do_redraw(self):
+        self._redraw_pending = False
+        self._refresh_transform(self._redraw_moved)
+
+    def _refresh_highlight(self):
+        """Atualiza o destaque da simulação só nos itens cujo estado de ativação mudou."""
+        current_active_set = self._sim_context()[0]
+        canvas = self.canvas
+        leaving = self._drawn_active - current_active_set
+        if leaving:
+            fill, outline, width = self._state_style(False)
+            if len(leaving) == len(self._drawn_active):
+                # Nenhum estado continua ativo: reconfigura todos pela tag de uma vez
+                canvas.itemconfigure("active", fill=fill, outline=outline, width=width)
+                canvas.dtag("active", "active")
+            else:
+                for sid in leaving:
+                    widgets = self.state_widgets.get(sid)
+                    if widgets is None: continue
+                    canvas.itemconfigure(widgets["oval"], fill=fill, outline=outline, width=width)
+                    canvas.dtag(widgets["oval"], "active")
+        fill, outline, width = self._state_style(True)
+        for sid in current_active_set - self._drawn_active:
+            widgets = self.state_widgets.get(sid)
+            if widgets is None: continue
+            canvas.itemconfigure(widgets["oval"], fill=fill, outline=outline, width=width)
+            canvas.addtag_withtag("active", widgets["oval"])
+        self._drawn_active = current_active_set
+
+        active_edges = self._active_edges({k: info["syms"] for k, info in self.edge_widgets.items()})
+        for key in active_edges ^ self._drawn_active_edges:
+            info = self.edge_widgets.get(key)
+            if info is None: continue
+            color, width = self._edge_style(key in active_edges)
+            self.canvas.itemconfigure(info["line"], fill=color, width=width)
+            self.canvas.itemconfigure(info["text"], fill=color)
+        self._drawn_active_edges = active_edges
+
+        self._draw_overlay()
+
     def _reposition_states(self):
         self.positions = {}
         x, y = 100, 100
-        for i, s in enumerate(sorted(list(self.automato.states))): self.positions[s] = (x + (i%7)*120, y + (i//7)*120)
+        for i, s in enumerate(self.automato.sorted_states()): self.positions[s] = (x + (i%7)*120, y + (i//7)*120)
 
     def _center_on_positions(self):
         """Centraliza a view do canvas nas posições atuais dos estados."""
@@ -1017,10 +1274,10 @@ class EditorGUI:
                 # Aceita se consumiu TUDO e está no estado final
                 accepted = (final_idx == len(self.sim_input_str)) and bool(final_states & self.automato.final_states)
                 self.result_indicator = "ACEITA" if accepted else "REJEITADA"
-                self.draw_all()
+                self._refresh_highlight()
             return
         self.sim_step += 1
-        self.draw_all()
+        self._refresh_highlight()
     # ***** FIM DA MODIFICAÇÃO *****
 
     def cmd_play_pause(self):
@@ -1040,7 +1297,7 @@ class EditorGUI:
             accepted = (final_idx == len(self.sim_input_str)) and bool(final_states & self.automato.final_states)
             self.result_indicator = "ACEITA" if accepted else "REJEITADA"
             self.sim_playing = False
-            self.draw_all()
+            self._refresh_highlight()
     # ***** FIM DA MODIFICAÇÃO *****
 
     def cmd_reset_sim(self):
@@ -1062,16 +1319,18 @@ class EditorGUI:
         messagebox.showinfo("Resultados dos Testes", "\n".join(results), parent=self.root)
 
     def _push_undo_snapshot(self):
-        snap = snapshot_of(self.automato, self.positions)
+        snap = memory_snapshot_of(self.automato, self.positions)
         if not self.undo_stack or self.undo_stack[-1] != snap:
+            if self.undo_stack and self.undo_stack[-1][1] == snap[1]:
+                # Posições iguais às do snapshot anterior: compartilha o mesmo dicionário
+                snap = (snap[0], self.undo_stack[-1][1])
             self.undo_stack.append(snap)
-            if len(self.undo_stack) > 50: self.undo_stack.pop(0)
             self.redo_stack.clear()
 
     def undo(self):
         if len(self.undo_stack) > 1:
             self.redo_stack.append(self.undo_stack.pop())
-            self.automato, self.positions = restore_from_snapshot(self.undo_stack[-1])
+            self.automato, self.positions = restore_from_memory_snapshot(self.undo_stack[-1])
             self.draw_all(); self.status.config(text="Desfeito.")
         else: self.status.config(text="Nada para desfazer.")
 
@@ -1079,7 +1338,7 @@ class EditorGUI:
         if self.redo_stack:
             snap = self.redo_stack.pop()
             self.undo_stack.append(snap)
-            self.automato, self.positions = restore_from_snapshot(snap)
+            self.automato, self.positions = restore_from_memory_snapshot(snap)
             self.draw_all(); self.status.config(text="Refeito.")
         else: self.status.config(text="Nada para refazer.")
 
@@ -1100,11 +1359,8 @@ class EditorGUI:
         def esc(t):
             return str(t).replace('&', '&amp;')
 
-        # Agrega transições (src,dst) -> set(symbols)
-        agg = {}
-        for (src, sym), dsts in self.automato.transitions.items():
-            for dst in dsts:
-                agg.setdefault((src, dst), set()).add(sym)
+        # Agrega transições (src,dst) -> symbols
+        agg = self.automato.edge_symbols()
 
         svg = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="0 0 {w} {h}">']
 
@@ -1150,7 +1406,7 @@ class EditorGUI:
                     svg.append(f'<text x="{txt_x}" y="{txt_y-5}" font-family="Helvetica" font-size="12" text-anchor="middle">{esc(label)}</text>')
 
         # Estados
-        for sid in sorted(list(self.automato.states)):
+        for sid in self.automato.sorted_states():
             x_logic, y_logic = self.positions.get(sid, (100, 100))
             x, y = self._from_canvas(x_logic, y_logic)
             fill = "#e0f2fe" if sid in (self.history[self.sim_step][0] if self.history else set()) else "white"